@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+N = 2000
+
+def legacy_add_scammer(path, phone, reason):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("INSERT INTO scammers (phone, reason) VALUES (?, ?)", (phone, reason))
+    conn.commit()
+    conn.close()
+
+def legacy_get_all_scammers(path):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("SELECT phone, reason FROM scammers")
+    scammers = c.fetchall()
+    conn.close()
+    return scammers
+
+def rate(label, n, func):
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n / elapsed:>12,.0f} ops/s")
+
+def main():
+    from db import db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        config.DB_PATH = legacy_path
+        db.init_db()
+        db.close_db()
+        sqlite3.connect(legacy_path).execute("PRAGMA journal_mode=DELETE").connection.close()
+
+        config.DB_PATH = os.path.join(tmp, "pooled.db")
+        db.init_db()
+
+        rate("legacy insert", N, lambda i: legacy_add_scammer(legacy_path, f"+23480{i:08d}", "bench"))
+        rate("pooled insert", N, lambda i: db.add_scammer(f"+23480{i:08d}", "bench"))
+        rate("legacy read (full table)", 200, lambda i: legacy_get_all_scammers(legacy_path))
+        rate("pooled read (full table)", 200, lambda i: db.get_all_scammers())
+        db.close_db()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.updates import fake_api_result, message_update, report_flow
+
+STEPS = ("start", "report", "phone", "reason", "scammers")
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def stub_request(self, method, data=None, files=None, **kwargs):
+    return fake_api_result(method, data or {})
+
+async def run(users, rounds):
+    from aiogram import Bot, Dispatcher, types
+    import main
+
+    Bot.request = stub_request
+    Bot.set_current(main.bot)
+    Dispatcher.set_current(main.dp)
+    latencies = {step: [] for step in STEPS}
+
+    async def feed(step, update):
+        start = time.perf_counter()
+        # One task per update, like the executor, so FSM context vars are fresh;
+        # process_updates runs the update middlewares (the concurrency limit).
+        await asyncio.create_task(main.dp.process_updates([types.Update(**update)]))
+        latencies[step].append(time.perf_counter() - start)
+
+    async def user(user_id):
+        for n in range(rounds):
+            await feed("start", message_update(user_id, "/start"))
+            report, phone, reason = report_flow(user_id, f"+2348{user_id:05d}{n:04d}", f"fake investment {n}")
+            await feed("report", report)
+            await feed("phone", phone)
+            await feed("reason", reason)
+            await feed("scammers", message_update(user_id, "/scammers"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(10000 + i) for i in range(users)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} updates from {users} users in {elapsed:.2f}s: {total / elapsed:,.0f} updates/s, "
+          f"{users * rounds / elapsed:,.0f} /report flows/s")
+    print(f"{'handler':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for step, values in latencies.items():
+        values.sort()
+        print(f"{step:<10} " + " ".join(f"{percentile(values, q) * 1000:>8.2f}" for q in (0.5, 0.95, 0.99)))
+
+    await main.on_shutdown(main.dp)
+    await main.dp.storage.close()
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.BOT_TOKEN = "123456:BENCHMARK"
+        config.DB_PATH = os.path.join(tmp, "scammers.db")
+        config.FSM_DB_PATH = os.path.join(tmp, "fsm.db")
+        config.TELEGRAM_API_SERVER = ""
+        # The Bot API is stubbed, so Telegram's flood limits do not apply.
+        config.SEND_GLOBAL_RATE = config.SEND_CHAT_RATE = config.SEND_CHAT_BURST = 1_000_000
+        # Every synthetic user reports once per round.
+        config.REPORT_USER_LIMIT = 1_000_000
+        asyncio.run(run(args.users, args.rounds))
+
+if __name__ == "__main__":
+    main_cli()
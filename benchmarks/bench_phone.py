@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.phone import _SEPARATORS, normalize_phone, split_country_code
+
+N = 500_000
+INPUTS = [
+    "0801 234 5678", "+234-801-234-5678", "2348012345678", "8012345678", "+234 (0) 803 123 4567",
+    "+44 7911 123456", "+1 (415) 555-0100", "0044 20 7946 0958", "+91 98765 43210", "+233 24 123 4567",
+    "call me", "080123", "+999123456789", "+2348012345678901",
+]
+
+def normalize_unchecked(text, country_code="234"):
+    # The parser before country codes were checked: only the digit count.
+    if not text:
+        return None
+    raw = text.strip().translate(_SEPARATORS)
+    if raw.startswith("+"):
+        digits = raw[1:]
+    elif raw.startswith("00"):
+        digits = raw[2:]
+    elif raw.startswith("0"):
+        digits = country_code + raw[1:]
+    elif raw.startswith(country_code) or len(raw) > 10:
+        digits = raw
+    else:
+        digits = country_code + raw
+    if not (digits.isascii() and digits.isdigit()) or digits.startswith("0"):
+        return None
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+def rate(label, func, inputs):
+    rounds = N // len(inputs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in inputs:
+            func(text)
+    elapsed = time.perf_counter() - start
+    count = rounds * len(inputs)
+    print(f"{label:<32} {count / elapsed:>12,.0f} parses/s  {elapsed / count * 1e6:>6.2f} us")
+
+def main():
+    rejected = [text for text in INPUTS if normalize_phone(text) is None]
+    print(f"{len(INPUTS) - len(rejected)} of {len(INPUTS)} sample inputs valid; rejected: {rejected}")
+    rate("length check only (old)", normalize_unchecked, INPUTS)
+    rate("normalize_phone (trie)", normalize_phone, INPUTS)
+    rate("split_country_code", split_country_code, ["2348012345678", "447911123456", "14155550100", "999123456789"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+WORDS = "investment mtn loan crypto airtime bitcoin giveaway romance job visa opay palmpay bank recharge".split()
+QUERIES = ["investment", "mtn airtime", "crypto giveaway", "visa job", "nothingmatches"]
+
+def main(reports=200_000, batch=10_000):
+    from db import db
+
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, "search.db")
+        db.init_db()
+        for start in range(0, reports, batch):
+            db.add_scammers([
+                (f"+23480{i:08d}", " ".join(random.sample(WORDS, 4)) + f" report {i}")
+                for i in range(start, min(start + batch, reports))
+            ])
+        for query in QUERIES:
+            runs = 20
+            start = time.perf_counter()
+            for _ in range(runs):
+                db.search_reports(query, 0, config.SCAMMERS_PAGE_SIZE, config.SEARCH_RANK_WINDOW)
+            elapsed = (time.perf_counter() - start) / runs
+            print(f"{query!r:<20} {elapsed * 1000:>8.2f} ms/page at {reports:,} reports")
+        db.close_db()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
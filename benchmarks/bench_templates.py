@@ -0,0 +1,42 @@
+import os
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import templates
+
+N = 200_000
+PHONE = "+2348012345678"
+REASON = "Ya karɓi kuɗi <500k> don 'investment' & ya ɓace"
+
+def rate(label, func):
+    start = time.perf_counter()
+    for _ in range(N):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {N / elapsed:>12,.0f} renders/s  {elapsed / N * 1e6:>6.2f} us")
+
+def fstring():
+    return f"""📢 WhatsApp SCAMMER REPORT
+
+Lamba: {PHONE}
+Dalili: {REASON}
+
+📝 Zaka iya turawa WhatsApp Support a: wa.me/wa_support
+"""
+
+def main():
+    rate("inline f-string (old)", fstring)
+    source = templates.TEMPLATES["report"]["ha"]["plain"]
+    rate("string.Template per call", lambda: string.Template(source).substitute(phone=PHONE, reason=REASON))
+    compiled = string.Template(source)
+    rate("string.Template reused", lambda: compiled.substitute(phone=PHONE, reason=REASON))
+    for language in templates.LANGUAGES:
+        for fmt in templates.FORMATS:
+            rate(f"compiled {language}/{fmt}", lambda: templates.render(
+                "report", language, fmt, phone=PHONE, reason=REASON, date="2025-01-01"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.updates import fake_api_result, message_update, report_flow
+from utils.supervisor import Supervisor
+
+async def stub_request(self, method, data=None, files=None, **kwargs):
+    return fake_api_result(method, data or {})
+
+def child(tmp):
+    # One worker process: the real main.py worker loop with the Bot API stubbed.
+    config.BOT_TOKEN = "123456:BENCHMARK"
+    config.DB_PATH = os.path.join(tmp, "scammers.db")
+    config.FSM_DB_PATH = os.path.join(tmp, "fsm.db")
+    config.SEND_GLOBAL_RATE = config.SEND_CHAT_RATE = config.SEND_CHAT_BURST = 1_000_000
+    config.REPORT_USER_LIMIT = 1_000_000
+    from aiogram import Bot
+    Bot.request = stub_request
+    import main
+    open(os.path.join(tmp, f"ready.{os.getpid()}"), "w").close()
+    asyncio.run(main.run_worker())
+
+def updates(users, rounds):
+    # Users interleaved, each one's flow in order, as Telegram would deliver them.
+    for n in range(rounds):
+        flows = []
+        for user_id in range(10000, 10000 + users):
+            flows.append([
+                message_update(user_id, "/start"),
+                *report_flow(user_id, f"+2348{user_id:05d}{n:04d}", f"fake investment {n}"),
+                message_update(user_id, "/scammers"),
+            ])
+        for step in zip(*flows):
+            yield from step
+
+async def run(workers, users, rounds):
+    batch = list(updates(users, rounds))
+    with tempfile.TemporaryDirectory() as tmp:
+        # The first process creates the schema before the others start.
+        init = await asyncio.create_subprocess_exec(sys.executable, "-c", (
+            "import sys; sys.path.insert(0, sys.argv[1]); import config; config.DB_PATH = sys.argv[2];"
+            "from db.db import init_db; init_db()"
+        ), os.path.dirname(os.path.dirname(os.path.abspath(__file__))), os.path.join(tmp, "scammers.db"))
+        await init.wait()
+        supervisor = Supervisor(workers, [sys.executable, os.path.abspath(__file__), "--child", tmp])
+        await supervisor.start()
+        while sum(name.startswith("ready.") for name in os.listdir(tmp)) < workers:
+            await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        for update in batch:
+            await supervisor.dispatch(update)
+        await supervisor.stop()
+        elapsed = time.perf_counter() - start
+        with sqlite3.connect(os.path.join(tmp, "scammers.db")) as conn:
+            reports = conn.execute("SELECT COUNT(*) FROM scammers").fetchone()[0]
+    print(f"{workers} worker(s): {len(batch)} updates in {elapsed:.2f}s, {len(batch) / elapsed:,.0f} updates/s, "
+          f"{reports}/{users * rounds} reports stored")
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count()}")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--child")
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+    print(f"{os.cpu_count()} CPU(s)")
+    for workers in sorted({int(n) for n in args.workers.split(",")}):
+        asyncio.run(run(workers, args.users, args.rounds))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+REPORTS = 5000
+CONCURRENCY = 200
+
+async def run(label, submit):
+    queue = asyncio.Queue()
+    for i in range(REPORTS):
+        queue.put_nowait((f"+23480{i % 500:08d}", f"scam wave {i}"))
+
+    async def reporter():
+        while not queue.empty():
+            phone, reason = queue.get_nowait()
+            await submit(phone, reason)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(reporter() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {REPORTS / elapsed:>12,.0f} reports/s")
+
+async def main():
+    from db import db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = os.path.join(tmp, "per_report.db")
+        db.init_db()
+        await run("commit per report", lambda phone, reason: db.run_write(db.add_scammer, phone, reason))
+        await db.run_write(db.close_db)
+
+        config.DB_PATH = os.path.join(tmp, "group_commit.db")
+        db.init_db()
+        await run("group commit queue", db.report_queue.submit)
+        await db.report_queue.stop()
+        await db.run_write(db.close_db)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import ClientSession, web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.updates import fake_api_result, report_flow
+
+# Drives `python main.py --webhook` like Telegram would: posts updates to the
+# webhook and answers the bot's Bot API calls. Start this first, then the bot
+# with TELEGRAM_API_SERVER = "http://127.0.0.1:8081" in config.py.
+
+calls = {}
+
+async def bot_api(request):
+    method = request.match_info["method"]
+    params = dict(request.query)
+    if request.can_read_body:
+        params.update(await request.post())
+    calls[method] = calls.get(method, 0) + 1
+    return web.json_response({"ok": True, "result": fake_api_result(method, params)})
+
+async def wait_for_webhook(session, webhook_url):
+    while True:
+        try:
+            async with session.get(webhook_url):
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+
+async def drive(webhook_url, users):
+    async with ClientSession() as session:
+        await wait_for_webhook(session, webhook_url)
+        async def user_flow(user_id):
+            for update in report_flow(user_id, f"+23480{user_id:08d}", f"fake investment {user_id}"):
+                async with session.post(webhook_url, json=update) as response:
+                    response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user_flow(1000 + i) for i in range(users)))
+        return time.perf_counter() - start
+
+async def main(users, api_port):
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", bot_api)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", api_port).start()
+
+    webhook_url = f"http://{config.WEBAPP_HOST}:{config.WEBAPP_PORT}{config.WEBHOOK_PATH}"
+    elapsed = await drive(webhook_url, users)
+    # Give handlers that outlived the webhook response time to reply.
+    await asyncio.sleep(1)
+    print(f"{users * 3} updates in {elapsed:.2f}s ({users * 3 / elapsed:,.0f} updates/s)")
+    print("Bot API calls:", calls)
+    await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--api-port", type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.api_port))
@@ -0,0 +1,55 @@
+import itertools
+import time
+
+_ids = itertools.count(1)
+
+def user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}", "language_code": "ha"}
+
+def chat(chat_id):
+    return {"id": chat_id, "type": "private"}
+
+def message_update(user_id, text):
+    message = {
+        "message_id": next(_ids),
+        "date": int(time.time()),
+        "chat": chat(user_id),
+        "from": user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": next(_ids), "message": message}
+
+def callback_update(user_id, data, message_id=1):
+    return {
+        "update_id": next(_ids),
+        "callback_query": {
+            "id": str(next(_ids)),
+            "from": user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()), "chat": chat(user_id), "text": ""},
+        },
+    }
+
+def report_flow(user_id, phone, reason):
+    return [
+        message_update(user_id, "/report"),
+        message_update(user_id, phone),
+        message_update(user_id, reason),
+    ]
+
+def fake_api_result(method, params):
+    # Minimal Bot API results so aiogram can deserialize the replies.
+    if method == "getMe":
+        return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+    if method.startswith(("send", "edit")):
+        chat_id = int(params.get("chat_id") or 0)
+        return {
+            "message_id": next(_ids),
+            "date": int(time.time()),
+            "chat": chat(chat_id),
+            "text": params.get("text", ""),
+        }
+    return True
@@ -1,31 +1,312 @@
-import sqlite3
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
+import config
+from db.phone_index import PhoneSnapshot, phone_index, write_snapshot
+from db.sqlite_backend import SQLiteBackend
+from utils.cache import result_cache
+from utils.metrics import DB_SECONDS, Gauge, timed
+from utils.phone import normalize_phone
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if config.DB_BACKEND == "postgres":
+                    # Imported here so SQLite deployments do not need psycopg.
+                    from db.postgres_backend import PostgresBackend
+                    _backend = PostgresBackend(config.DATABASE_URL, config.DB_POOL_SIZE)
+                else:
+                    _backend = SQLiteBackend(config.DB_PATH, config.DB_POOL_SIZE, config.DB_BUSY_TIMEOUT)
+    return _backend
+
+# SQLite allows one writer at a time, so writes get a single dedicated thread
+# while reads use their own threads and never queue behind a slow fsync.
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+_read_executor = ThreadPoolExecutor(max_workers=config.DB_READ_THREADS, thread_name_prefix="db-read")
+
+_pending = {"write": 0, "read": 0}
+
+async def _run_in(executor, kind, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    _pending[kind] += 1
+    try:
+        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    finally:
+        _pending[kind] -= 1
+
+async def run_write(func, *args, **kwargs):
+    return await _run_in(_write_executor, "write", func, *args, **kwargs)
+
+async def run_read(func, *args, **kwargs):
+    return await _run_in(_read_executor, "read", func, *args, **kwargs)
+
+Gauge("bot_db_pending_writes", "Database write calls queued or running.", lambda: _pending["write"])
+Gauge("bot_db_pending_reads", "Database read calls queued or running.", lambda: _pending["read"])
+
+def close_db():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
+@timed(DB_SECONDS)
 def init_db():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect("data/scammers.db")
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS scammers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            phone TEXT NOT NULL,
-            reason TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    if get_backend().init():
+        # A migration may have changed the canonical numbers the snapshot
+        # holds; load_phone_index() writes a fresh one when it is missing.
+        try:
+            os.remove(phone_snapshot_path())
+        except FileNotFoundError:
+            pass
+
+def _index_reports(rows, commit):
+    # Held across the commit so a concurrent reload of the index
+    # either sees these reports in the database or gets them from add().
+    with phone_index.lock:
+        commit()
+        for _, phone_e164, _, _ in rows:
+            if phone_e164 is not None:
+                phone_index.add(phone_e164)
+    result_cache.invalidate()
 
+@timed(DB_SECONDS)
+def add_normalized_scammers(reports):
+    now = int(time.time())
+    rows = [(phone, phone_e164, reason, now) for phone, phone_e164, reason in reports]
+    if not rows:
+        return []
+    ids = get_backend().add_reports(rows, partial(_index_reports, rows))
+    # Growing the threshold with the snapshot keeps bulk imports to a few rebuilds.
+    if phone_index.delta_size > max(config.PHONE_SNAPSHOT_MAX_DELTA, phone_index.snapshot_size // 2):
+        load_phone_index(rebuild=True)
+    return ids
+
+@timed(DB_SECONDS)
+def add_scammers(reports):
+    return add_normalized_scammers([(phone, normalize_phone(phone), reason) for phone, reason in reports])
+
+@timed(DB_SECONDS)
 def add_scammer(phone, reason):
-    conn = sqlite3.connect("data/scammers.db")
-    c = conn.cursor()
-    c.execute("INSERT INTO scammers (phone, reason) VALUES (?, ?)", (phone, reason))
-    conn.commit()
-    conn.close()
+    return add_scammers([(phone, reason)])[0]
+
+class ReportWriteQueue:
+    def __init__(self, batch_size=100, flush_interval=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, phone, reason):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((phone, reason, future))
+        self._has_pending.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        # Resolves with the report id once its batch has been committed.
+        return await future
+
+    async def _run(self):
+        while not self._stopping:
+            await self._has_pending.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        self._has_pending.clear()
+        self._full.clear()
+        if not batch:
+            return
+        try:
+            ids = await run_write(add_scammers, [(phone, reason) for phone, reason, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), report_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(report_id)
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._has_pending.set()
+            self._full.set()
+            await self._task
+            self._task = None
+        while self._pending:
+            await self.flush()
+
+report_queue = ReportWriteQueue(config.WRITE_BATCH_SIZE, config.WRITE_FLUSH_INTERVAL)
+Gauge("bot_report_queue_depth", "Reports waiting for the next group commit.", lambda: len(report_queue))
 
+@timed(DB_SECONDS)
 def get_all_scammers():
-    conn = sqlite3.connect("data/scammers.db")
-    c = conn.cursor()
-    c.execute("SELECT phone, reason FROM scammers")
-    scammers = c.fetchall()
-    conn.close()
-    return scammers
+    return get_backend().all_reports()
+
+def iter_scammers(chunk_size=1000):
+    # Keyset pages by id, so memory stays at one chunk and the connection goes
+    # back to the pool between chunks instead of pinning a read snapshot.
+    last_id = 0
+    while True:
+        with DB_SECONDS.time("iter_scammers"):
+            rows = get_backend().reports_after(last_id, chunk_size)
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+@timed(DB_SECONDS)
+def get_reports_by_phone(phone):
+    phone_e164 = normalize_phone(phone)
+    if phone_e164 is None:
+        return []
+    return get_backend().reports_by_phone(phone_e164)
+
+@timed(DB_SECONDS)
+def find_evidence(file_unique_id):
+    return get_backend().find_evidence(file_unique_id)
+
+@timed(DB_SECONDS)
+def add_evidence(sha256, size, mime_type, file_unique_id, file_id, kind):
+    return get_backend().add_evidence(sha256, size, mime_type, file_unique_id, file_id, kind, int(time.time()))
+
+@timed(DB_SECONDS)
+def link_evidence(report_id, evidence_id, max_files):
+    # The report's file count after linking, or None if it already had max_files.
+    return get_backend().link_evidence(report_id, evidence_id, max_files)
+
+@timed(DB_SECONDS)
+def get_evidence_by_phone(phone, limit=10):
+    phone_e164 = normalize_phone(phone)
+    if phone_e164 is None:
+        return []
+    return get_backend().evidence_by_phone(phone_e164, limit)
+
+def phone_snapshot_path():
+    return os.path.splitext(config.DB_PATH)[0] + ".phones"
+
+_snapshot_lock = threading.Lock()
+
+@timed(DB_SECONDS)
+def write_phone_snapshot(path=None):
+    with _snapshot_lock:
+        get_backend().read_phone_stats(partial(write_snapshot, path or phone_snapshot_path()))
+
+@timed(DB_SECONDS)
+def load_phone_index(rebuild=False):
+    path = phone_snapshot_path()
+    snapshot = None
+    if not rebuild:
+        try:
+            snapshot = PhoneSnapshot.open(path)
+        except (OSError, ValueError):
+            pass
+    max_id = get_backend().max_report_id()
+    # Missing, belonging to another database, or too far behind to replay.
+    if snapshot is None or snapshot.last_id > max_id or max_id - snapshot.last_id > config.PHONE_SNAPSHOT_MAX_DELTA:
+        write_phone_snapshot(path)
+        snapshot = PhoneSnapshot.open(path)
+    with phone_index.lock:
+        phone_index.load(snapshot, get_backend().counts_after(snapshot.last_id))
+
+_synced = {"max_id": None}
+
+@timed(DB_SECONDS)
+def sync_phone_index():
+    # Picks up reports committed by other processes sharing the database:
+    # reloading replays every report since the snapshot, whoever wrote it.
+    max_id = get_backend().max_report_id()
+    if max_id == _synced["max_id"]:
+        return
+    load_phone_index()
+    result_cache.invalidate()
+    _synced["max_id"] = max_id
+
+@timed(DB_SECONDS)
+def compact_phone_index():
+    # Folds the reports added since the snapshot into a new one, so the delta
+    # dict stays small between the rebuilds add_normalized_scammers triggers.
+    if get_backend().max_report_id() == phone_index.snapshot_last_id:
+        return False
+    load_phone_index(rebuild=True)
+    return True
+
+@timed(DB_SECONDS)
+def analyze_db():
+    get_backend().analyze()
+
+@timed(DB_SECONDS)
+def vacuum_db(pages=1000):
+    return get_backend().incremental_vacuum(pages)
+
+@timed(DB_SECONDS)
+def checkpoint_db():
+    return get_backend().checkpoint()
+
+@timed(DB_SECONDS)
+def optimize_search_index():
+    get_backend().optimize_search()
+
+@timed(DB_SECONDS)
+def get_scammers_page(cursor=0, limit=10, backwards=False):
+    rows = get_backend().scammers_page(cursor, limit + 1, backwards)
+    if backwards:
+        has_prev = len(rows) > limit
+        return rows[:limit][::-1], has_prev, True
+    has_next = len(rows) > limit
+    return rows[:limit], cursor > 0, has_next
+
+@timed(DB_SECONDS)
+def get_top_scammers(limit=10):
+    return get_backend().top_scammers(limit)
+
+def _score_match(highlighted, avg_length, k1=1.2, b=0.75):
+    # BM25 term-frequency/length part. For an AND query every candidate holds
+    # every term, so the IDF factor barely changes the order and is skipped.
+    hits = highlighted.count("\x01")
+    length = len(highlighted.split()) or 1
+    return hits * (k1 + 1) / (hits + k1 * (1 - b + b * length / avg_length))
+
+@timed(DB_SECONDS)
+def search_reports(terms, offset=0, limit=10, rank_window=200, before_id=None):
+    # Ranks one window of rank_window matches older than before_id. The last
+    # value is the id the next, older window starts below, or None when this
+    # window already holds the oldest match.
+    candidates = get_backend().search_candidates(terms, rank_window, before_id)
+    if not candidates:
+        return [], False, False, None
+    older = min(row[0] for row in candidates) if len(candidates) == rank_window else None
+    avg_length = sum(len(text.split()) for _, _, text in candidates) / len(candidates) or 1
+    candidates.sort(key=lambda row: _score_match(row[2], avg_length), reverse=True)
+    rows = [
+        (report_id, phone, text.replace("\x01", "«").replace("\x02", "»")[:200])
+        for report_id, phone, text in candidates[offset:offset + limit]
+    ]
+    return rows, offset > 0, len(candidates) > offset + limit, older
@@ -0,0 +1,67 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import config
+
+class _HashingWriter(io.RawIOBase):
+    # Handed to aiogram's download as the destination: every chunk is hashed
+    # on its way to disk, so the file is never held in memory or read twice.
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+class EvidenceStore:
+    """
+    Evidence files on disk, named by the SHA-256 of their content.
+
+    A screenshot forwarded by many users is kept once, at
+    <root>/<first two hex digits>/<digest>. Downloads stream into a temp file
+    under <root>/tmp and are then moved into place, or dropped if a file with
+    the same digest is already there.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    async def save(self, download):
+        # download(destination) writes the file into destination chunk by chunk.
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as fileobj:
+                writer = _HashingWriter(fileobj)
+                await download(writer)
+            digest = writer.sha256.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Same content under the same name, so a concurrent save of
+                # the same file replacing this one is harmless.
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest, writer.size
+
+evidence_store = EvidenceStore(config.EVIDENCE_DIR)
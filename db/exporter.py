@@ -0,0 +1,56 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script, db/ itself would shadow the db package.
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from db.db import init_db, iter_scammers
+
+COLUMNS = ("id", "phone", "phone_e164", "reason", "created_at")
+
+def export_file(path, fmt="csv", progress=None, progress_every=50000):
+    # Rows go straight from the cursor into the gzip stream, so memory stays
+    # flat whatever the size of the table.
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6) as fileobj:
+        if fmt == "json":
+            def write(row):
+                fileobj.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+        else:
+            writer = csv.writer(fileobj)
+            writer.writerow(COLUMNS)
+            write = writer.writerow
+        for row in iter_scammers():
+            write(row)
+            count += 1
+            if progress is not None and count % progress_every == 0:
+                progress(count)
+    return count
+
+def export_filename(fmt):
+    extension = "ndjson" if fmt == "json" else "csv"
+    return f"scammers-{time.strftime('%Y%m%d')}.{extension}.gz"
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reported numbers to a gzip-compressed CSV or NDJSON file.")
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--db", default=config.DB_PATH)
+    args = parser.parse_args()
+
+    config.DB_PATH = args.db
+    init_db()
+    path = args.path or export_filename(args.format)
+    start = time.perf_counter()
+    count = export_file(path, args.format, lambda n: print(f"\r{n:,} exported", end="", flush=True))
+    print(f"\nDone: {count:,} reports written to {path} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
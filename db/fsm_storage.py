@@ -0,0 +1,154 @@
+import asyncio
+import copy
+import json
+import os
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from aiogram.dispatcher.storage import BaseStorage
+
+from db.sqlite_backend import ConnectionPool
+
+EMPTY = {"state": None, "data": {}, "bucket": {}}
+
+class SQLiteStorage(BaseStorage):
+    """
+    SQLite based states storage.
+
+    States survive restarts and can be shared by several bot processes using the same file.
+    Conversations that are not touched for `ttl` seconds are treated as finished and evicted.
+    """
+
+    def __init__(self, path, ttl=86400, eviction_interval=600):
+        self.ttl = ttl
+        self.eviction_interval = eviction_interval
+        self._next_eviction = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._pool = ConnectionPool(path, size=1)
+        # One thread keeps every read-modify-write for a user in order.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        with self._pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fsm_states (
+                    chat TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    state TEXT,
+                    data TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (chat, user)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)")
+            conn.commit()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def _read(self, conn, chat, user):
+        row = conn.execute(
+            "SELECT state, data, bucket, updated_at FROM fsm_states WHERE chat = ? AND user = ?",
+            (chat, user),
+        ).fetchone()
+        if row is None or row[3] < time.time() - self.ttl:
+            return copy.deepcopy(EMPTY)
+        return {"state": row[0], "data": json.loads(row[1]), "bucket": json.loads(row[2])}
+
+    def _get(self, chat, user):
+        with self._pool.connection() as conn:
+            return self._read(conn, chat, user)
+
+    def _modify(self, chat, user, change):
+        now = int(time.time())
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            record = self._read(conn, chat, user)
+            change(record)
+            if record == EMPTY:
+                conn.execute("DELETE FROM fsm_states WHERE chat = ? AND user = ?", (chat, user))
+            else:
+                conn.execute("""
+                    INSERT INTO fsm_states (chat, user, state, data, bucket, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (chat, user) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        bucket = excluded.bucket,
+                        updated_at = excluded.updated_at
+                """, (chat, user, record["state"], json.dumps(record["data"]), json.dumps(record["bucket"]), now))
+            if now >= self._next_eviction:
+                conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (now - self.ttl,))
+                self._next_eviction = now + self.eviction_interval
+            conn.commit()
+
+    def resolve_address(self, chat, user):
+        return tuple(map(str, self.check_address(chat=chat, user=user)))
+
+    async def wait_closed(self):
+        pass
+
+    async def close(self):
+        await self._run(self._pool.close)
+        self._executor.shutdown(wait=True)
+
+    async def get_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+        record = await self._run(self._get, *self.resolve_address(chat, user))
+        return record["state"] or self.resolve_state(default)
+
+    async def get_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       default: typing.Optional[dict] = None) -> typing.Dict:
+        record = await self._run(self._get, *self.resolve_address(chat, user))
+        return record["data"] or default or {}
+
+    async def set_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        state: typing.AnyStr = None):
+        state = self.resolve_state(state)
+        await self._run(self._modify, *self.resolve_address(chat, user), lambda record: record.update(state=state))
+
+    async def set_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       data: typing.Dict = None):
+        data = copy.deepcopy(data or {})
+        await self._run(self._modify, *self.resolve_address(chat, user), lambda record: record.update(data=data))
+
+    async def update_data(self, *,
+                          chat: typing.Union[str, int, None] = None,
+                          user: typing.Union[str, int, None] = None,
+                          data: typing.Dict = None, **kwargs):
+        changes = dict(data or {}, **kwargs)
+        await self._run(self._modify, *self.resolve_address(chat, user), lambda record: record["data"].update(changes))
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         default: typing.Optional[dict] = None) -> typing.Dict:
+        record = await self._run(self._get, *self.resolve_address(chat, user))
+        return record["bucket"] or default or {}
+
+    async def set_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         bucket: typing.Dict = None):
+        bucket = copy.deepcopy(bucket or {})
+        await self._run(self._modify, *self.resolve_address(chat, user), lambda record: record.update(bucket=bucket))
+
+    async def update_bucket(self, *,
+                            chat: typing.Union[str, int, None] = None,
+                            user: typing.Union[str, int, None] = None,
+                            bucket: typing.Dict = None, **kwargs):
+        changes = dict(bucket or {}, **kwargs)
+        await self._run(self._modify, *self.resolve_address(chat, user), lambda record: record["bucket"].update(changes))
@@ -0,0 +1,136 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script, db/ itself would shadow the db package.
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from db.db import add_normalized_scammers, init_db, load_phone_index
+from db.phone_index import phone_index
+from utils.phone import normalize_phone
+
+CHUNK_SIZE = 1 << 16
+
+def iter_csv_rows(fileobj):
+    reader = csv.reader(fileobj)
+    phone_col, reason_col = 0, 1
+    for n, row in enumerate(reader):
+        if not row:
+            continue
+        if n == 0:
+            header = [cell.strip().lower() for cell in row]
+            if "phone" in header:
+                phone_col = header.index("phone")
+                reason_col = header.index("reason") if "reason" in header else None
+                continue
+        phone = row[phone_col] if phone_col < len(row) else ""
+        reason = row[reason_col] if reason_col is not None and reason_col < len(row) else ""
+        yield phone, reason
+
+def _iter_json_values(fileobj):
+    # Handles both a top-level JSON array and newline-delimited JSON without
+    # loading the document: values are decoded one at a time from a rolling buffer.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    while True:
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+                position += 1
+            if position >= len(buffer):
+                break
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                break
+            if end == len(buffer) and not eof:
+                # A number at the end of the buffer may continue in the next chunk.
+                break
+            yield value
+            position = end
+        buffer = buffer[position:]
+        if eof:
+            return
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+def iter_json_rows(fileobj):
+    for value in _iter_json_values(fileobj):
+        if isinstance(value, dict):
+            yield str(value.get("phone", "")), str(value.get("reason") or "")
+        else:
+            yield str(value), ""
+
+def detect_format(path):
+    return "json" if path.lower().endswith((".json", ".ndjson", ".jsonl")) else "csv"
+
+def import_reports(rows, source, batch_size=50000, progress=None):
+    default_reason = f"Imported from {source}"
+    imported = skipped = 0
+    batch = []
+    seen = set()
+
+    def flush():
+        nonlocal imported
+        if batch:
+            add_normalized_scammers(batch)
+            imported += len(batch)
+            batch.clear()
+            seen.clear()
+        if progress is not None:
+            progress(imported, skipped)
+
+    for phone, reason in rows:
+        phone_e164 = normalize_phone(phone)
+        # Numbers already reported (or seen earlier in this file) are skipped;
+        # committed batches are in phone_index, the current one is in `seen`.
+        if phone_e164 is None or phone_e164 in phone_index or phone_e164 in seen:
+            skipped += 1
+            continue
+        seen.add(phone_e164)
+        batch.append((phone.strip(), phone_e164, reason.strip() or default_reason))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return imported, skipped
+
+def import_file(path, fmt=None, source=None, batch_size=50000, progress=None):
+    fmt = fmt or detect_format(path)
+    source = source or os.path.basename(path)
+    with open(path, "r", encoding="utf-8-sig", newline="") as fileobj:
+        rows = iter_json_rows(fileobj) if fmt == "json" else iter_csv_rows(fileobj)
+        return import_reports(rows, source, batch_size, progress)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import reported numbers from a CSV or JSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "json"))
+    parser.add_argument("--source", help="name used in the reason of rows that have none")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--db", default=config.DB_PATH)
+    args = parser.parse_args()
+
+    config.DB_PATH = args.db
+    init_db()
+    load_phone_index()
+    start = time.perf_counter()
+
+    def progress(imported, skipped):
+        elapsed = time.perf_counter() - start
+        print(f"\r{imported:,} imported, {skipped:,} skipped ({elapsed:.1f}s)", end="", flush=True)
+
+    imported, skipped = import_file(args.path, args.format, args.source, args.batch_size, progress)
+    print(f"\nDone: {imported:,} imported, {skipped:,} skipped in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+MAGIC = b"PHSNAP01"
+# magic, number of entries, highest scammers.id folded into the snapshot
+HEADER = struct.Struct("=8sQQ")
+
+def phone_key(phone_e164):
+    # Canonical numbers are "+" and at most 15 digits without a leading zero,
+    # so the digits fit a uint64 and keep the same order numerically.
+    return int(phone_e164[1:])
+
+class PhoneSnapshot:
+    """
+    Read-only, memory-mapped set of reported numbers.
+
+    The file holds a header, the sorted numbers as uint64 and their report
+    counts as uint32. Lookups binary-search the mapping directly, so millions
+    of numbers cost 12 bytes each in the page cache and nothing on the heap.
+    """
+
+    def __init__(self, keys=(), counts=(), last_id=0, mapping=None):
+        self._keys = keys
+        self._counts = counts
+        self._mmap = mapping
+        self.last_id = last_id
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as fileobj:
+            mapping = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, last_id = HEADER.unpack_from(mapping) if len(mapping) >= HEADER.size else (None, 0, 0)
+        if magic != MAGIC or len(mapping) != HEADER.size + size * 12:
+            mapping.close()
+            raise ValueError(f"{path} is not a phone snapshot")
+        view = memoryview(mapping)
+        keys = view[HEADER.size:HEADER.size + size * 8].cast("Q")
+        counts = view[HEADER.size + size * 8:].cast("I")
+        return cls(keys, counts, last_id, mapping)
+
+    def count(self, key):
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return self._counts[index]
+        return 0
+
+    def __contains__(self, key):
+        return self.count(key) > 0
+
+    def __len__(self):
+        return len(self._keys)
+
+def write_snapshot(path, rows, last_id):
+    # rows are (phone_e164, report_count) in numeric order of the number.
+    keys = array("Q")
+    counts = array("I")
+    for phone_e164, count in rows:
+        keys.append(phone_key(phone_e164))
+        counts.append(min(count, 0xFFFFFFFF))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Per-process temp name: worker processes may rewrite the snapshot at once.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fileobj:
+        fileobj.write(HEADER.pack(MAGIC, len(keys), last_id))
+        keys.tofile(fileobj)
+        counts.tofile(fileobj)
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+    # Readers keep their old mapping; the rename only affects the next open.
+    os.replace(tmp_path, path)
+
+class PhoneIndex:
+    def __init__(self):
+        # The snapshot and the numbers reported since it was written are
+        # swapped together so readers never see one without the other.
+        self._state = (PhoneSnapshot(), {})
+        # Held by writers across commit + add() and by reloads, so a reload
+        # never drops a report that was committed but not yet added.
+        self.lock = threading.Lock()
+
+    def load(self, snapshot, rows):
+        delta = {}
+        for phone_e164, count in rows:
+            key = phone_key(phone_e164)
+            delta[key] = delta.get(key, 0) + count
+        self._state = (snapshot, delta)
+
+    def add(self, phone_e164, count=1):
+        delta = self._state[1]
+        key = phone_key(phone_e164)
+        delta[key] = delta.get(key, 0) + count
+
+    def count(self, phone_e164):
+        snapshot, delta = self._state
+        key = phone_key(phone_e164)
+        return snapshot.count(key) + delta.get(key, 0)
+
+    def __contains__(self, phone_e164):
+        return self.count(phone_e164) > 0
+
+    def __len__(self):
+        snapshot, delta = self._state
+        return len(snapshot) + sum(1 for key in delta if key not in snapshot)
+
+    @property
+    def snapshot_last_id(self):
+        return self._state[0].last_id
+
+    @property
+    def snapshot_size(self):
+        return len(self._state[0])
+
+    @property
+    def delta_size(self):
+        return len(self._state[1])
+
+# Shared in-process index of canonical numbers -> report count, so /check
+# never has to query SQLite.
+phone_index = PhoneIndex()
@@ -0,0 +1,303 @@
+from utils.phone import normalize_phone
+
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    psycopg = None
+
+def _migrate_create_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammers (
+            id BIGSERIAL PRIMARY KEY,
+            phone TEXT NOT NULL,
+            phone_e164 TEXT,
+            reason TEXT NOT NULL,
+            created_at BIGINT,
+            reason_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', reason)) STORED
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scammers_phone_e164 ON scammers (phone_e164)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scammers_reason_tsv ON scammers USING GIN (reason_tsv)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammer_stats (
+            id BIGSERIAL PRIMARY KEY,
+            phone_e164 TEXT NOT NULL UNIQUE,
+            report_count INTEGER NOT NULL,
+            first_seen BIGINT NOT NULL,
+            last_seen BIGINT NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scammer_stats_rank ON scammer_stats (report_count DESC, id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammer_reasons (
+            phone_e164 TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            report_count INTEGER NOT NULL,
+            PRIMARY KEY (phone_e164, reason)
+        )
+    """)
+
+def _migrate_evidence(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS evidence (
+            id BIGSERIAL PRIMARY KEY,
+            sha256 TEXT NOT NULL UNIQUE,
+            size BIGINT NOT NULL,
+            mime_type TEXT,
+            created_at BIGINT NOT NULL
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS evidence_files (
+            file_unique_id TEXT PRIMARY KEY,
+            evidence_id BIGINT NOT NULL REFERENCES evidence (id),
+            file_id TEXT NOT NULL,
+            kind TEXT NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_evidence_files_evidence ON evidence_files (evidence_id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS report_evidence (
+            report_id BIGINT NOT NULL REFERENCES scammers (id),
+            evidence_id BIGINT NOT NULL REFERENCES evidence (id),
+            PRIMARY KEY (report_id, evidence_id)
+        )
+    """)
+
+def _migrate_renormalize_phones(c):
+    # The calling-code parser gives some stored numbers a different canonical
+    # form, or none; the aggregates are rebuilt from the corrected rows.
+    changed = [
+        (canonical, row_id)
+        for row_id, phone, phone_e164 in c.execute("SELECT id, phone, phone_e164 FROM scammers").fetchall()
+        if (canonical := normalize_phone(phone)) != phone_e164
+    ]
+    with c.cursor() as cursor:
+        cursor.executemany("UPDATE scammers SET phone_e164 = %s WHERE id = %s", changed)
+    c.execute("DELETE FROM scammer_stats")
+    c.execute("DELETE FROM scammer_reasons")
+    c.execute("""
+        INSERT INTO scammer_stats (phone_e164, report_count, first_seen, last_seen)
+        SELECT phone_e164, COUNT(*), COALESCE(MIN(created_at), 0), COALESCE(MAX(created_at), 0)
+        FROM scammers WHERE phone_e164 IS NOT NULL
+        GROUP BY phone_e164 ORDER BY MIN(id)
+    """)
+    c.execute("""
+        INSERT INTO scammer_reasons (phone_e164, reason, report_count)
+        SELECT phone_e164, reason, COUNT(*) FROM scammers
+        WHERE phone_e164 IS NOT NULL
+        GROUP BY phone_e164, reason
+    """)
+
+# Applied in order; schema_version records how many have run.
+MIGRATIONS = (
+    _migrate_create_tables,
+    _migrate_evidence,
+    _migrate_renormalize_phones,
+)
+
+_STATS_COLUMNS = """
+    s.id, s.phone_e164, s.report_count, s.first_seen, s.last_seen,
+    (SELECT r.reason FROM scammer_reasons r WHERE r.phone_e164 = s.phone_e164
+     ORDER BY r.report_count DESC LIMIT 1) AS top_reason
+"""
+
+# Upper bound for "older than" keysets when paging starts at the newest row.
+_NO_LIMIT_ID = (1 << 63) - 1
+
+class PostgresBackend:
+    """
+    Report storage in PostgreSQL, so several bot processes can share one database.
+
+    Implements the same methods as SQLiteBackend. Try it against a local server:
+    docker run -e POSTGRES_USER=bot -e POSTGRES_PASSWORD=bot -e POSTGRES_DB=scammers -p 5432:5432 postgres:16
+    """
+
+    def __init__(self, url, pool_size=4):
+        if psycopg is None:
+            raise RuntimeError('DB_BACKEND = "postgres" needs psycopg: pip install "psycopg[binary,pool]"')
+        self.url = url
+        self.pool = ConnectionPool(url, min_size=1, max_size=pool_size, open=True)
+
+    def init(self):
+        with self.pool.connection() as conn:
+            # Only one process runs the migrations; the others wait for it.
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext('scammers_schema'))")
+            conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+            row = conn.execute("SELECT version FROM schema_version").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO schema_version (version) VALUES (0)")
+            version = row[0] if row else 0
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                migration(conn)
+                conn.execute("UPDATE schema_version SET version = %s", (number,))
+        # Tells the caller whether derived files may be stale.
+        return version < len(MIGRATIONS)
+
+    def close(self):
+        self.pool.close()
+
+    def add_reports(self, rows, commit):
+        phones, phones_e164, reasons, created = (list(column) for column in zip(*rows))
+        with self.pool.connection() as conn:
+            ids = [row[0] for row in conn.execute("""
+                INSERT INTO scammers (phone, phone_e164, reason, created_at)
+                SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::bigint[])
+                RETURNING id
+            """, (phones, phones_e164, reasons, created))]
+            # Sorted keys make concurrent workers take row locks in the same order.
+            conn.execute("""
+                INSERT INTO scammer_stats (phone_e164, report_count, first_seen, last_seen)
+                SELECT phone_e164, COUNT(*), MIN(created_at), MAX(created_at) FROM scammers
+                WHERE id = ANY(%s) AND phone_e164 IS NOT NULL
+                GROUP BY phone_e164 ORDER BY phone_e164
+                ON CONFLICT (phone_e164) DO UPDATE SET
+                    report_count = scammer_stats.report_count + excluded.report_count,
+                    last_seen = excluded.last_seen
+            """, (ids,))
+            conn.execute("""
+                INSERT INTO scammer_reasons (phone_e164, reason, report_count)
+                SELECT phone_e164, reason, COUNT(*) FROM scammers
+                WHERE id = ANY(%s) AND phone_e164 IS NOT NULL
+                GROUP BY phone_e164, reason ORDER BY phone_e164, reason
+                ON CONFLICT (phone_e164, reason) DO UPDATE SET
+                    report_count = scammer_reasons.report_count + excluded.report_count
+            """, (ids,))
+            commit(conn.commit)
+        return sorted(ids)
+
+    def all_reports(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT phone, reason FROM scammers").fetchall()
+
+    def reports_after(self, last_id, limit):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT id, phone, phone_e164, reason, created_at FROM scammers WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, limit),
+            ).fetchall()
+
+    def reports_by_phone(self, phone_e164):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT phone, reason FROM scammers WHERE phone_e164 = %s", (phone_e164,)).fetchall()
+
+    def max_report_id(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM scammers").fetchone()[0]
+
+    def read_phone_stats(self, consume):
+        with self.pool.connection() as conn:
+            # One snapshot, so the stats and last_id describe the same rows.
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scammers").fetchone()[0]
+            with conn.cursor(name="phone_stats") as cursor:
+                cursor.execute(
+                    'SELECT phone_e164, report_count FROM scammer_stats ORDER BY length(phone_e164), phone_e164 COLLATE "C"'
+                )
+                return consume(cursor, last_id)
+
+    def counts_after(self, last_id):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT phone_e164, COUNT(*) FROM scammers WHERE id > %s AND phone_e164 IS NOT NULL GROUP BY phone_e164",
+                (last_id,),
+            ).fetchall()
+
+    def scammers_page(self, cursor, limit, backwards):
+        with self.pool.connection() as conn:
+            if backwards:
+                return conn.execute(
+                    f"SELECT {_STATS_COLUMNS} FROM scammer_stats s WHERE s.id < %s ORDER BY s.id DESC LIMIT %s",
+                    (cursor, limit),
+                ).fetchall()
+            return conn.execute(
+                f"SELECT {_STATS_COLUMNS} FROM scammer_stats s WHERE s.id > %s ORDER BY s.id LIMIT %s",
+                (cursor, limit),
+            ).fetchall()
+
+    def top_scammers(self, limit):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT {_STATS_COLUMNS} FROM scammer_stats s ORDER BY s.report_count DESC, s.id LIMIT %s",
+                (limit,),
+            ).fetchall()
+
+    def find_evidence(self, file_unique_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT evidence_id FROM evidence_files WHERE file_unique_id = %s", (file_unique_id,)).fetchone()
+            return row[0] if row else None
+
+    def add_evidence(self, sha256, size, mime_type, file_unique_id, file_id, kind, created_at):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT INTO evidence (sha256, size, mime_type, created_at) VALUES (%s, %s, %s, %s) ON CONFLICT (sha256) DO NOTHING",
+                (sha256, size, mime_type, created_at),
+            )
+            evidence_id = conn.execute("SELECT id FROM evidence WHERE sha256 = %s", (sha256,)).fetchone()[0]
+            conn.execute("""
+                INSERT INTO evidence_files (file_unique_id, evidence_id, file_id, kind) VALUES (%s, %s, %s, %s)
+                ON CONFLICT (file_unique_id) DO NOTHING
+            """, (file_unique_id, evidence_id, file_id, kind))
+            return evidence_id
+
+    def link_evidence(self, report_id, evidence_id, max_files):
+        # The report row lock serializes concurrent links to one report, so
+        # the count and the insert see the same set of files.
+        with self.pool.connection() as conn:
+            conn.execute("SELECT id FROM scammers WHERE id = %s FOR UPDATE", (report_id,))
+            count = conn.execute("SELECT COUNT(*) FROM report_evidence WHERE report_id = %s", (report_id,)).fetchone()[0]
+            if count >= max_files:
+                return None
+            count += conn.execute(
+                "INSERT INTO report_evidence (report_id, evidence_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                (report_id, evidence_id),
+            ).rowcount
+            return count
+
+    def evidence_by_phone(self, phone_e164, limit):
+        with self.pool.connection() as conn:
+            return conn.execute("""
+                SELECT kind, file_id FROM evidence_files
+                WHERE file_unique_id IN (
+                    SELECT MIN(f.file_unique_id) FROM scammers s
+                    JOIN report_evidence r ON r.report_id = s.id
+                    JOIN evidence_files f ON f.evidence_id = r.evidence_id
+                    WHERE s.phone_e164 = %s
+                    GROUP BY r.evidence_id
+                    ORDER BY r.evidence_id DESC
+                    LIMIT %s
+                )
+            """, (phone_e164, limit)).fetchall()
+
+    def analyze(self):
+        with self.pool.connection() as conn:
+            conn.execute("ANALYZE scammers, scammer_stats, scammer_reasons")
+
+    def incremental_vacuum(self, pages):
+        # VACUUM cannot run inside a transaction, so it gets its own autocommit
+        # connection. PostgreSQL has no page budget; plain VACUUM does not lock
+        # out readers or writers.
+        with psycopg.connect(self.url, autocommit=True) as conn:
+            conn.execute("VACUUM scammers, scammer_stats, scammer_reasons")
+
+    def checkpoint(self):
+        # The server checkpoints its own WAL.
+        return None
+
+    def optimize_search(self):
+        with self.pool.connection() as conn:
+            # Moves new entries from the GIN fast-update list into the main index.
+            conn.execute("SELECT gin_clean_pending_list('idx_scammers_reason_tsv'::regclass)")
+
+    def search_candidates(self, terms, rank_window, before_id=None):
+        # Same shape as SQLiteBackend: newest matches first, matched words in \x01 ... \x02.
+        with self.pool.connection() as conn:
+            return conn.execute("""
+                SELECT id, COALESCE(phone_e164, phone),
+                       ts_headline('simple', reason, query, %s)
+                FROM scammers, plainto_tsquery('simple', %s) AS query
+                WHERE reason_tsv @@ query AND id < %s
+                ORDER BY id DESC
+                LIMIT %s
+            """, ("StartSel=\x01, StopSel=\x02, HighlightAll=true", terms, before_id or _NO_LIMIT_ID, rank_window)).fetchall()
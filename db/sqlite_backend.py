@@ -0,0 +1,459 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.phone import normalize_phone
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA foreign_keys=ON",
+)
+
+class ConnectionPool:
+    def __init__(self, path, size=4, timeout=5.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self.size:
+                conn = self._connect()
+                self._connections.append(conn)
+                return conn
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._idle = queue.LifoQueue()
+
+def _migrate_create_scammers(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone TEXT NOT NULL,
+            reason TEXT NOT NULL
+        )
+    """)
+
+def _migrate_phone_e164(c):
+    columns = [row[1] for row in c.execute("PRAGMA table_info(scammers)")]
+    if "phone_e164" not in columns:
+        c.execute("ALTER TABLE scammers ADD COLUMN phone_e164 TEXT")
+    rows = c.execute("SELECT id, phone FROM scammers WHERE phone_e164 IS NULL").fetchall()
+    c.executemany(
+        "UPDATE scammers SET phone_e164 = ? WHERE id = ?",
+        [(normalize_phone(phone), row_id) for row_id, phone in rows],
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scammers_phone_e164 ON scammers (phone_e164)")
+
+def _migrate_scammer_stats(c):
+    columns = [row[1] for row in c.execute("PRAGMA table_info(scammers)")]
+    if "created_at" not in columns:
+        c.execute("ALTER TABLE scammers ADD COLUMN created_at INTEGER")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammer_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone_e164 TEXT NOT NULL UNIQUE,
+            report_count INTEGER NOT NULL,
+            first_seen INTEGER NOT NULL,
+            last_seen INTEGER NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_scammer_stats_rank ON scammer_stats (report_count DESC, id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scammer_reasons (
+            phone_e164 TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            report_count INTEGER NOT NULL,
+            PRIMARY KEY (phone_e164, reason)
+        ) WITHOUT ROWID
+    """)
+    _fill_stats(c)
+
+def _fill_stats(c):
+    now = int(time.time())
+    c.execute("""
+        INSERT OR IGNORE INTO scammer_stats (phone_e164, report_count, first_seen, last_seen)
+        SELECT phone_e164, COUNT(*), COALESCE(MIN(created_at), ?), COALESCE(MAX(created_at), ?)
+        FROM scammers WHERE phone_e164 IS NOT NULL
+        GROUP BY phone_e164 ORDER BY MIN(id)
+    """, (now, now))
+    c.execute("""
+        INSERT OR IGNORE INTO scammer_reasons (phone_e164, reason, report_count)
+        SELECT phone_e164, reason, COUNT(*) FROM scammers
+        WHERE phone_e164 IS NOT NULL
+        GROUP BY phone_e164, reason
+    """)
+
+def _migrate_reason_fts(c):
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS scammers_fts USING fts5(
+            reason,
+            content='scammers',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS scammers_fts_insert AFTER INSERT ON scammers BEGIN
+            INSERT INTO scammers_fts (rowid, reason) VALUES (new.id, new.reason);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS scammers_fts_delete AFTER DELETE ON scammers BEGIN
+            INSERT INTO scammers_fts (scammers_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS scammers_fts_update AFTER UPDATE OF reason ON scammers BEGIN
+            INSERT INTO scammers_fts (scammers_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+            INSERT INTO scammers_fts (rowid, reason) VALUES (new.id, new.reason);
+        END
+    """)
+    c.execute("INSERT INTO scammers_fts (scammers_fts) VALUES ('rebuild')")
+
+def _migrate_fts_batch_insert(c):
+    # A per-row trigger costs ~30us per report; SQLiteBackend.add_reports now
+    # indexes each inserted batch with one INSERT ... SELECT instead.
+    c.execute("DROP TRIGGER IF EXISTS scammers_fts_insert")
+
+def _migrate_incremental_vacuum(c):
+    # auto_vacuum only changes on a VACUUM; after that, freed pages can be
+    # returned a few at a time with PRAGMA incremental_vacuum.
+    if c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        c.execute("VACUUM")
+
+def _migrate_evidence(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS evidence (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sha256 TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mime_type TEXT,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    # file_unique_id stays the same when a file is forwarded, but a re-upload
+    # of the same content gets a new one; every id for that content points at
+    # one evidence row, and file_id lets the bot resend it.
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS evidence_files (
+            file_unique_id TEXT PRIMARY KEY,
+            evidence_id INTEGER NOT NULL REFERENCES evidence (id),
+            file_id TEXT NOT NULL,
+            kind TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_evidence_files_evidence ON evidence_files (evidence_id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS report_evidence (
+            report_id INTEGER NOT NULL REFERENCES scammers (id),
+            evidence_id INTEGER NOT NULL REFERENCES evidence (id),
+            PRIMARY KEY (report_id, evidence_id)
+        ) WITHOUT ROWID
+    """)
+
+def _migrate_renormalize_phones(c):
+    # The calling-code parser gives some stored numbers a different canonical
+    # form, or none; the aggregates are rebuilt from the corrected rows.
+    last_id = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, phone, phone_e164 FROM scammers WHERE id > ? ORDER BY id LIMIT 10000", (last_id,)
+        ).fetchall()
+        if not rows:
+            break
+        changed = []
+        for row_id, phone, phone_e164 in rows:
+            canonical = normalize_phone(phone)
+            if canonical != phone_e164:
+                changed.append((canonical, row_id))
+        c.executemany("UPDATE scammers SET phone_e164 = ? WHERE id = ?", changed)
+        last_id = rows[-1][0]
+    c.execute("DELETE FROM scammer_stats")
+    c.execute("DELETE FROM scammer_reasons")
+    _fill_stats(c)
+
+# Applied in order; PRAGMA user_version records how many have run.
+MIGRATIONS = (
+    _migrate_create_scammers,
+    _migrate_phone_e164,
+    _migrate_scammer_stats,
+    _migrate_reason_fts,
+    _migrate_fts_batch_insert,
+    _migrate_incremental_vacuum,
+    _migrate_evidence,
+    _migrate_renormalize_phones,
+)
+
+def _update_stats(c, first_id, now):
+    # Folds the rows inserted since first_id into the aggregates in one pass;
+    # GROUP BY also feeds the unique indexes in key order.
+    c.execute("""
+        INSERT INTO scammer_stats (phone_e164, report_count, first_seen, last_seen)
+        SELECT phone_e164, COUNT(*), ?, ? FROM scammers
+        WHERE id >= ? AND phone_e164 IS NOT NULL
+        GROUP BY phone_e164
+        ON CONFLICT (phone_e164) DO UPDATE SET
+            report_count = report_count + excluded.report_count,
+            last_seen = excluded.last_seen
+    """, (now, now, first_id))
+    c.execute("""
+        INSERT INTO scammer_reasons (phone_e164, reason, report_count)
+        SELECT phone_e164, reason, COUNT(*) FROM scammers
+        WHERE id >= ? AND phone_e164 IS NOT NULL
+        GROUP BY phone_e164, reason
+        ON CONFLICT (phone_e164, reason) DO UPDATE SET
+            report_count = report_count + excluded.report_count
+    """, (first_id,))
+
+_STATS_COLUMNS = """
+    s.id, s.phone_e164, s.report_count, s.first_seen, s.last_seen,
+    (SELECT r.reason FROM scammer_reasons r WHERE r.phone_e164 = s.phone_e164
+     ORDER BY r.report_count DESC LIMIT 1) AS top_reason
+"""
+
+def _fts_query(terms):
+    # Quote every word so user input is never parsed as FTS5 query syntax.
+    words = [word.replace('"', '""') for word in terms.split()]
+    return " ".join(f'"{word}"' for word in words if word)
+
+# Upper bound for "older than" keysets when paging starts at the newest row.
+_NO_LIMIT_ID = (1 << 63) - 1
+
+class SQLiteBackend:
+    """Report storage in a local SQLite file (WAL mode, FTS5 search)."""
+
+    def __init__(self, path, pool_size=4, timeout=5.0):
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size, timeout)
+
+    def init(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                migration(c)
+                c.execute(f"PRAGMA user_version={number}")
+                conn.commit()
+        # Tells the caller whether derived files may be stale.
+        return version < len(MIGRATIONS)
+
+    def close(self):
+        self.pool.close()
+
+    def add_reports(self, rows, commit):
+        # rows are (phone, phone_e164, reason, created_at); commit(conn.commit)
+        # lets the caller update in-memory state atomically with the commit.
+        with self.pool.connection() as conn:
+            c = conn.cursor()
+            c.executemany(
+                "INSERT INTO scammers (phone, phone_e164, reason, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            # The transaction holds the write lock, so its AUTOINCREMENT ids are consecutive.
+            last_id = c.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first_id = last_id - len(rows) + 1
+            c.execute(
+                "INSERT INTO scammers_fts (rowid, reason) SELECT id, reason FROM scammers WHERE id >= ?",
+                (first_id,),
+            )
+            _update_stats(c, first_id, rows[0][3])
+            commit(conn.commit)
+        return list(range(first_id, last_id + 1))
+
+    def all_reports(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT phone, reason FROM scammers").fetchall()
+
+    def reports_after(self, last_id, limit):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT id, phone, phone_e164, reason, created_at FROM scammers WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit),
+            ).fetchall()
+
+    def reports_by_phone(self, phone_e164):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT phone, reason FROM scammers WHERE phone_e164 = ?", (phone_e164,)).fetchall()
+
+    def max_report_id(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM scammers").fetchone()[0]
+
+    def read_phone_stats(self, consume):
+        with self.pool.connection() as conn:
+            # One read transaction, so the stats and last_id describe the same rows.
+            conn.execute("BEGIN")
+            try:
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scammers").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT phone_e164, report_count FROM scammer_stats ORDER BY length(phone_e164), phone_e164"
+                )
+                return consume(rows, last_id)
+            finally:
+                conn.rollback()
+
+    def counts_after(self, last_id):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT phone_e164, COUNT(*) FROM scammers WHERE id > ? AND phone_e164 IS NOT NULL GROUP BY phone_e164",
+                (last_id,),
+            ).fetchall()
+
+    def scammers_page(self, cursor, limit, backwards):
+        with self.pool.connection() as conn:
+            if backwards:
+                return conn.execute(
+                    f"SELECT {_STATS_COLUMNS} FROM scammer_stats s WHERE s.id < ? ORDER BY s.id DESC LIMIT ?",
+                    (cursor, limit),
+                ).fetchall()
+            return conn.execute(
+                f"SELECT {_STATS_COLUMNS} FROM scammer_stats s WHERE s.id > ? ORDER BY s.id LIMIT ?",
+                (cursor, limit),
+            ).fetchall()
+
+    def top_scammers(self, limit):
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT {_STATS_COLUMNS} FROM scammer_stats s ORDER BY s.report_count DESC, s.id LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    def find_evidence(self, file_unique_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT evidence_id FROM evidence_files WHERE file_unique_id = ?", (file_unique_id,)).fetchone()
+            return row[0] if row else None
+
+    def add_evidence(self, sha256, size, mime_type, file_unique_id, file_id, kind, created_at):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO evidence (sha256, size, mime_type, created_at) VALUES (?, ?, ?, ?)",
+                (sha256, size, mime_type, created_at),
+            )
+            evidence_id = conn.execute("SELECT id FROM evidence WHERE sha256 = ?", (sha256,)).fetchone()[0]
+            conn.execute(
+                "INSERT OR IGNORE INTO evidence_files (file_unique_id, evidence_id, file_id, kind) VALUES (?, ?, ?, ?)",
+                (file_unique_id, evidence_id, file_id, kind),
+            )
+            conn.commit()
+            return evidence_id
+
+    def link_evidence(self, report_id, evidence_id, max_files):
+        # Counted in the same transaction as the insert, so files of an album
+        # arriving together cannot push a report past max_files.
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            count = conn.execute("SELECT COUNT(*) FROM report_evidence WHERE report_id = ?", (report_id,)).fetchone()[0]
+            if count >= max_files:
+                conn.rollback()
+                return None
+            count += conn.execute(
+                "INSERT OR IGNORE INTO report_evidence (report_id, evidence_id) VALUES (?, ?)",
+                (report_id, evidence_id),
+            ).rowcount
+            conn.commit()
+            return count
+
+    def evidence_by_phone(self, phone_e164, limit):
+        # One copy of each distinct file, newest evidence first.
+        with self.pool.connection() as conn:
+            return conn.execute("""
+                SELECT kind, file_id FROM evidence_files
+                WHERE file_unique_id IN (
+                    SELECT MIN(f.file_unique_id) FROM scammers s
+                    JOIN report_evidence r ON r.report_id = s.id
+                    JOIN evidence_files f ON f.evidence_id = r.evidence_id
+                    WHERE s.phone_e164 = ?
+                    GROUP BY r.evidence_id
+                    ORDER BY r.evidence_id DESC
+                    LIMIT ?
+                )
+            """, (phone_e164, limit)).fetchall()
+
+    def analyze(self):
+        with self.pool.connection() as conn:
+            # Sampling keeps ANALYZE to milliseconds on large tables; the query
+            # planner only needs rough row counts.
+            conn.execute("PRAGMA analysis_limit=1000")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+
+    def incremental_vacuum(self, pages):
+        with self.pool.connection() as conn:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # Each step of the statement frees one page, and execute() stops after
+            # the first step of a statement without columns; executescript() runs
+            # it to the end.
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def checkpoint(self):
+        with self.pool.connection() as conn:
+            # TRUNCATE also shrinks the -wal file back to zero bytes; it gives up
+            # after busy_timeout if readers keep the WAL in use.
+            busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+            return not busy
+
+    def optimize_search(self):
+        with self.pool.connection() as conn:
+            # Merges the FTS index's per-batch segments into one b-tree.
+            conn.execute("INSERT INTO scammers_fts (scammers_fts) VALUES ('optimize')")
+            conn.commit()
+
+    def search_candidates(self, terms, rank_window, before_id=None):
+        # Newest matches first, with matched words wrapped in \x01 ... \x02.
+        query = _fts_query(terms)
+        if not query:
+            return []
+        with self.pool.connection() as conn:
+            # bm25() counts every document that holds each term, which is O(matches)
+            # per query. Walking the index newest-first stops after rank_window rows,
+            # and only those candidates are ranked; before_id pages to older windows.
+            return conn.execute("""
+                SELECT s.id, COALESCE(s.phone_e164, s.phone),
+                       highlight(scammers_fts, 0, char(1), char(2))
+                FROM scammers_fts
+                JOIN scammers s ON s.id = scammers_fts.rowid
+                WHERE scammers_fts MATCH ? AND scammers_fts.rowid < ?
+                ORDER BY scammers_fts.rowid DESC
+                LIMIT ?
+            """, (query, before_id or _NO_LIMIT_ID, rank_window)).fetchall()
@@ -1,19 +1,45 @@
+import io
+import time
+
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from db.db import add_scammer
+from config import EVIDENCE_MAX_BYTES, EVIDENCE_MAX_FILES, EVIDENCE_WINDOW, REPORT_FORMAT
+from db.db import add_evidence, find_evidence, link_evidence, report_queue, run_read, run_write
+from db.evidence import evidence_store
+from utils import templates
+from utils.phone import normalize_phone
+from utils.ratelimit import report_number_limiter, report_user_limiter
+from utils.sender import sender
 
 class ReportScammer(StatesGroup):
     waiting_for_phone = State()
     waiting_for_reason = State()
 
 async def start_report(message: types.Message):
-    await message.answer("📞 Shigar da lambar WhatsApp scammer (misali: +2348012345678):")
+    if not report_user_limiter.allowed(message.from_user.id):
+        await sender.answer(message, "⏳ Ka yi report da yawa. Ka jira kaɗan kafin ka sake.")
+        return
+    await sender.answer(message, "📞 Shigar da lambar WhatsApp scammer (misali: +2348012345678):")
     await ReportScammer.waiting_for_phone.set()
 
+async def cancel_report(message: types.Message, state: FSMContext):
+    await state.finish()
+    await sender.answer(message, "❌ An soke. Yi amfani da /report don sake farawa.")
+
 async def process_phone(message: types.Message, state: FSMContext):
-    await state.update_data(phone=message.text)
-    await message.answer("✍️ Me wannan mutumin ya aikata? (gajeren bayani)")
+    # Stays in waiting_for_phone until the text parses as a real number.
+    phone_e164 = normalize_phone(message.text)
+    if phone_e164 is None:
+        await sender.answer(message, "⚠️ Wannan ba lambar waya ba ce. Shigar da lamba kamar +2348012345678 ko 08012345678:")
+        return
+    # Refused here, before the user is asked for a reason.
+    if not report_number_limiter.allowed((message.from_user.id, phone_e164)):
+        await sender.answer(message, "⚠️ Ka riga ka report ɗin wannan lamba. Na gode!")
+        await state.finish()
+        return
+    await state.update_data(phone=message.text.strip())
+    await sender.answer(message, "✍️ Me wannan mutumin ya aikata? (gajeren bayani)")
     await ReportScammer.waiting_for_reason.set()
 
 async def process_reason(message: types.Message, state: FSMContext):
@@ -21,11 +47,71 @@ async def process_reason(message: types.Message, state: FSMContext):
     phone = user_data['phone']
     reason = message.text
 
-    add_scammer(phone, reason)
+    # Checked before any DB work; both are counted only when the report goes
+    # through. The number was checked in process_phone already; this repeat
+    # catches a second flow for it that finished in the meantime.
+    user_key = message.from_user.id
+    number_key = (user_key, normalize_phone(phone))
+    if not report_number_limiter.allowed(number_key):
+        await sender.answer(message, "⚠️ Ka riga ka report ɗin wannan lamba. Na gode!")
+        await state.finish()
+        return
+    if not report_user_limiter.allowed(user_key):
+        await sender.answer(message, "⏳ Ka yi report da yawa. Ka jira kaɗan kafin ka sake.")
+        await state.finish()
+        return
+    report_number_limiter.hit(number_key)
+    report_user_limiter.hit(user_key)
+
+    report_id = await report_queue.submit(phone, reason)
+    await send_report(message, phone, reason)
+    await state.finish()
+    # Evidence is optional, so the conversation ends here and other commands
+    # keep working; photos sent within EVIDENCE_WINDOW attach to this report.
+    await state.update_data(evidence_report=report_id, evidence_until=time.time() + EVIDENCE_WINDOW)
+    await sender.answer(message, "📎 Kana da hoton hirar ka da scammer (screenshot)? Tura shi nan a matsayin hoto ko document. Idan ka gama, rubuta /done (ko /skip).")
+
+async def process_evidence(message: types.Message, state: FSMContext):
+    data = await state.get_data()
+    if data.get("evidence_until", 0) < time.time():
+        return
+    if message.photo:
+        attachment, kind, mime_type = message.photo[-1], "photo", "image/jpeg"
+    else:
+        attachment, kind, mime_type = message.document, "document", message.document.mime_type
+    if (attachment.file_size or 0) > EVIDENCE_MAX_BYTES:
+        await sender.answer(message, f"⚠️ File ɗin ya yi girma; iyaka {EVIDENCE_MAX_BYTES // (1024 * 1024)} MB ne.")
+        return
 
-    report_template = f"""📢 WhatsApp SCAMMER REPORT
+    # Forwarding keeps a file's file_unique_id, so a forwarded copy is linked
+    # without downloading it. A re-upload has a new id and is downloaded, then
+    # matched to the stored file by its SHA-256.
+    evidence_id = await run_read(find_evidence, attachment.file_unique_id)
+    if evidence_id is None:
+        digest, size = await evidence_store.save(lambda destination: attachment.download(destination_file=destination, seek=False))
+        evidence_id = await run_write(add_evidence, digest, size, mime_type, attachment.file_unique_id, attachment.file_id, kind)
+    # Counted by the database, not kept in FSM: the files of an album arrive
+    # as separate messages handled at the same time.
+    count = await run_write(link_evidence, data["evidence_report"], evidence_id, EVIDENCE_MAX_FILES)
+    if count is None:
+        await sender.answer(message, f"⚠️ Shaida {EVIDENCE_MAX_FILES} kawai ake karɓa a kowane report. Rubuta /done.")
+        return
+    await sender.answer(message, f"✅ An ajiye shaida {count}/{EVIDENCE_MAX_FILES}. Tura wata, ko /done idan ka gama.")
 
-Lamba: {phone}
-Dalili: {reason}
+async def finish_evidence(message: types.Message, state: FSMContext):
+    data = await state.get_data()
+    if data.get("evidence_until", 0) < time.time():
+        return
+    await state.update_data(evidence_report=None, evidence_until=0)
+    await sender.answer(message, "🙏 Na gode! An kammala report ɗinka.")
 
-📝 Zaka iya turawa WhatsApp Support a: wa.me/wa_support
+async def send_report(message: types.Message, phone, reason):
+    language = templates.language_for(message.from_user)
+    if REPORT_FORMAT == "file":
+        text = templates.render("report", language, "file", phone=phone, reason=reason, date=time.strftime("%Y-%m-%d"))
+        document = types.InputFile(io.BytesIO(text.encode("utf-8")), filename="scammer-report.txt")
+        await sender.call(message.chat.id, message.answer_document, document)
+    elif REPORT_FORMAT == "html":
+        await sender.answer(message, templates.render("report", language, "html", phone=phone, reason=reason), parse_mode="HTML")
+    else:
+        await sender.answer(message, templates.render("report", language, "plain", phone=phone, reason=reason))
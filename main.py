@@ -1,28 +1,85 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import time
+from functools import partial
+
 from aiogram import Bot, Dispatcher, executor, types
-from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.bot.api import TelegramAPIServer
+from aiohttp import web
 from handlers import report_handler
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Command
-from db.db import init_db, get_all_scammers
-from config import BOT_TOKEN
+from aiogram.utils.callback_data import CallbackData
+from db.db import init_db, load_phone_index, sync_phone_index, compact_phone_index, analyze_db, vacuum_db, checkpoint_db, optimize_search_index, get_scammers_page, get_top_scammers, search_reports, get_evidence_by_phone, report_queue, close_db, run_read, run_write
+from db.fsm_storage import SQLiteStorage
+from db.exporter import export_file, export_filename
+from db.importer import detect_format, import_file
+from db.phone_index import phone_index
+from utils.cache import result_cache
+from utils.metrics import TimedBot, render_prometheus, render_summary
+from utils.middlewares import CommandEndsStateMiddleware, ConcurrencyLimitMiddleware, MetricsMiddleware
+from utils.phone import normalize_phone
+from utils.scheduler import MaintenanceScheduler
+from utils.sender import BULK, sender
+from utils.supervisor import Supervisor, chat_id_of, poll_updates, webhook_app, worker_command
+from config import (
+    BOT_TOKEN, FSM_BACKEND, FSM_DB_PATH, FSM_STATE_TTL, REDIS_HOST, REDIS_PORT, REDIS_DB, SCAMMERS_PAGE_SIZE, SEARCH_RANK_WINDOW, MAX_CONCURRENT_UPDATES,
+    MAX_CONCURRENT_UPDATES_PER_CHAT, WEBHOOK_URL, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT, TELEGRAM_API_SERVER, ADMIN_IDS, WORKER_SYNC_INTERVAL,
+    MAINTENANCE_ANALYZE_INTERVAL, MAINTENANCE_VACUUM_INTERVAL, MAINTENANCE_VACUUM_PAGES, MAINTENANCE_CHECKPOINT_INTERVAL,
+    MAINTENANCE_SEARCH_INTERVAL, MAINTENANCE_SNAPSHOT_INTERVAL, SEND_GLOBAL_RATE,
+)
 
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher(bot, storage=MemoryStorage())
+if TELEGRAM_API_SERVER:
+    bot = TimedBot(token=BOT_TOKEN, server=TelegramAPIServer.from_base(TELEGRAM_API_SERVER))
+else:
+    bot = TimedBot(token=BOT_TOKEN)
+if FSM_BACKEND == "redis":
+    from aiogram.contrib.fsm_storage.redis import RedisStorage2
+    storage = RedisStorage2(REDIS_HOST, REDIS_PORT, db=REDIS_DB, state_ttl=FSM_STATE_TTL, data_ttl=FSM_STATE_TTL)
+else:
+    storage = SQLiteStorage(FSM_DB_PATH, FSM_STATE_TTL)
+dp = Dispatcher(bot, storage=storage)
+dp.middleware.setup(ConcurrencyLimitMiddleware(MAX_CONCURRENT_UPDATES, MAX_CONCURRENT_UPDATES_PER_CHAT))
+dp.middleware.setup(MetricsMiddleware())
+dp.middleware.setup(CommandEndsStateMiddleware([report_handler.ReportScammer.waiting_for_phone]))
 
 init_db()
+load_phone_index()
+
+# Write jobs share the single write thread with the report queue, so they
+# never contend with it for SQLite's write lock.
+maintenance = MaintenanceScheduler()
+maintenance.add("checkpoint", MAINTENANCE_CHECKPOINT_INTERVAL, run_write, checkpoint_db)
+maintenance.add("vacuum", MAINTENANCE_VACUUM_INTERVAL, run_write, vacuum_db, MAINTENANCE_VACUUM_PAGES)
+maintenance.add("analyze", MAINTENANCE_ANALYZE_INTERVAL, run_write, analyze_db)
+maintenance.add("search_index", MAINTENANCE_SEARCH_INTERVAL, run_write, optimize_search_index)
+maintenance.add("phone_snapshot", MAINTENANCE_SNAPSHOT_INTERVAL, run_read, compact_phone_index)
+
+scammers_cb = CallbackData("scammers", "direction", "cursor")
+search_cb = CallbackData("search", "window", "offset")
 
 @dp.message_handler(commands=["start"])
 async def cmd_start(message: types.Message):
-    await message.answer("👋 Sannu! Wannan bot yana taimaka maka wajen report ɗin WhatsApp scammers. Yi amfani da /report don farawa.")
+    await sender.answer(message, "👋 Sannu! Wannan bot yana taimaka maka wajen report ɗin WhatsApp scammers. Yi amfani da /report don farawa.")
 
 @dp.message_handler(commands=["help"])
 async def cmd_help(message: types.Message):
-    await message.answer("/report - Report WhatsApp scammer\n/scammers - Duba jerin lambobin da aka report")
+    await sender.answer(message, "/report - Report WhatsApp scammer\n/cancel - Soke report ɗin da kake yi\n/scammers - Duba jerin lambobin da aka report\n/check <lamba> - Duba ko an report wata lamba\n/top - Lambobin da aka fi report\n/search <kalmomi> - Nemo reports ta dalili")
 
 @dp.message_handler(commands=["report"])
 async def cmd_report(message: types.Message):
     await report_handler.start_report(message)
 
+@dp.message_handler(commands=["cancel"], state="*")
+async def cmd_cancel(message: types.Message, state: FSMContext):
+    await report_handler.cancel_report(message, state)
+
 @dp.message_handler(state=report_handler.ReportScammer.waiting_for_phone)
 async def phone_input(message: types.Message, state: FSMContext):
     await report_handler.process_phone(message, state)
@@ -31,14 +88,338 @@ async def phone_input(message: types.Message, state: FSMContext):
 async def reason_input(message: types.Message, state: FSMContext):
     await report_handler.process_reason(message, state)
 
+@dp.message_handler(commands=["check"])
+async def cmd_check(message: types.Message):
+    phone_e164 = normalize_phone(message.get_args())
+    if phone_e164 is None:
+        await sender.answer(message, "⚠️ Yi amfani da: /check +2348012345678")
+        return
+    count = phone_index.count(phone_e164)
+    if count:
+        await sender.answer(message, f"🚨 An report ɗin {phone_e164} sau {count}. Ka yi hankali!")
+    else:
+        await sender.answer(message, f"✅ Ba a taɓa report ɗin {phone_e164} ba tukuna.")
+
+def format_scammer_row(row):
+    _, phone_e164, report_count, _, _, top_reason = row
+    return f"{phone_e164} (x{report_count}) - {top_reason[:300]}"
+
+def render_scammers_page(rows, has_prev, has_next):
+    text = "\n".join(format_scammer_row(row) for row in rows)
+    keyboard = types.InlineKeyboardMarkup()
+    buttons = []
+    if has_prev:
+        buttons.append(types.InlineKeyboardButton("⬅️ Baya", callback_data=scammers_cb.new(direction="prev", cursor=rows[0][0])))
+    if has_next:
+        buttons.append(types.InlineKeyboardButton("Gaba ➡️", callback_data=scammers_cb.new(direction="next", cursor=rows[-1][0])))
+    keyboard.row(*buttons)
+    return f"🕵️ Jerin scammers:\n{text}", keyboard
+
+async def load_scammers_page(cursor, backwards=False):
+    rows, has_prev, has_next = await run_read(get_scammers_page, cursor, SCAMMERS_PAGE_SIZE, backwards)
+    return render_scammers_page(rows, has_prev, has_next) if rows else None
+
 @dp.message_handler(commands=["scammers"])
 async def cmd_scammers(message: types.Message):
-    scammers = get_all_scammers()
-    if not scammers:
-        await message.answer("❌ Babu wanda aka report tukuna.")
+    page = await result_cache.get_or_compute(("scammers", 0, False), lambda: load_scammers_page(0))
+    if page is None:
+        await sender.answer(message, "❌ Babu wanda aka report tukuna.")
+    else:
+        text, keyboard = page
+        await sender.answer(message, text, priority=BULK, reply_markup=keyboard)
+
+@dp.callback_query_handler(scammers_cb.filter())
+async def scammers_page(call: types.CallbackQuery, callback_data: dict):
+    backwards = callback_data["direction"] == "prev"
+    cursor = int(callback_data["cursor"])
+    page = await result_cache.get_or_compute(("scammers", cursor, backwards), lambda: load_scammers_page(cursor, backwards))
+    if page is None:
+        await call.answer("❌ Babu sauran shafi.")
+        return
+    text, keyboard = page
+    await sender.edit(call.message, text, priority=BULK, reply_markup=keyboard)
+    await call.answer()
+
+async def load_top_scammers():
+    rows = await run_read(get_top_scammers, SCAMMERS_PAGE_SIZE)
+    if not rows:
+        return None
+    text = "\n".join(format_scammer_row(row) for row in rows)
+    return f"🔥 Lambobin da aka fi report:\n{text}"
+
+@dp.message_handler(commands=["top"])
+async def cmd_top(message: types.Message):
+    text = await result_cache.get_or_compute(("top",), load_top_scammers)
+    if text is None:
+        await sender.answer(message, "❌ Babu wanda aka report tukuna.")
     else:
-        text = "\n".join([f"{p} - {r}" for p, r in scammers])
-        await message.answer(f"🕵️ Jerin scammers:\n{text}")
+        await sender.answer(message, text, priority=BULK)
+
+def render_search_page(terms, rows, window, offset, has_prev, has_next, older):
+    text = "\n".join(f"{phone} - {snippet}" for _, phone, snippet in rows)
+    keyboard = types.InlineKeyboardMarkup()
+    buttons = []
+    if has_prev:
+        buttons.append(types.InlineKeyboardButton("⬅️ Baya", callback_data=search_cb.new(window=window, offset=max(offset - SCAMMERS_PAGE_SIZE, 0))))
+    elif window > 0:
+        last_offset = (SEARCH_RANK_WINDOW - 1) // SCAMMERS_PAGE_SIZE * SCAMMERS_PAGE_SIZE
+        buttons.append(types.InlineKeyboardButton("⬅️ Baya", callback_data=search_cb.new(window=window - 1, offset=last_offset)))
+    if has_next:
+        buttons.append(types.InlineKeyboardButton("Gaba ➡️", callback_data=search_cb.new(window=window, offset=offset + SCAMMERS_PAGE_SIZE)))
+    elif older is not None:
+        buttons.append(types.InlineKeyboardButton("Tsofaffi ➡️", callback_data=search_cb.new(window=window + 1, offset=0)))
+    keyboard.row(*buttons)
+    header = f"🔎 Sakamakon neman \"{terms}\""
+    if window > 0:
+        header += " (tsofaffin reports)"
+    return f"{header}:\n{text}", keyboard
+
+async def load_search_page(terms, before, offset):
+    # Results are ranked SEARCH_RANK_WINDOW matches at a time, newest first;
+    # `older` is the keyset that starts the next, older window.
+    rows, has_prev, has_next, older = await run_read(search_reports, terms, offset, SCAMMERS_PAGE_SIZE, SEARCH_RANK_WINDOW, before)
+    return (rows, has_prev, has_next, older) if rows else None
+
+async def remember_search_window(state, windows, window, older):
+    # The id each window starts below, so its pages can be reached again;
+    # windows[0] is None (the newest matches).
+    if older is not None and len(windows) == window + 1:
+        await state.update_data(search_windows=windows + [older])
+
+@dp.message_handler(commands=["search"])
+async def cmd_search(message: types.Message, state: FSMContext):
+    terms = message.get_args().strip()
+    if not terms:
+        await sender.answer(message, "⚠️ Yi amfani da: /search investment")
+        return
+    page = await result_cache.get_or_compute(("search", terms, None, 0), lambda: load_search_page(terms, None, 0))
+    if page is None:
+        await sender.answer(message, f"❌ Ba a samu report mai \"{terms}\" ba.")
+        return
+    # Search terms can be longer than callback_data allows, so pages read them back from FSM data.
+    rows, has_prev, has_next, older = page
+    text, keyboard = render_search_page(terms, rows, 0, 0, has_prev, has_next, older)
+    await state.update_data(search_terms=terms, search_windows=[None])
+    await remember_search_window(state, [None], 0, older)
+    await sender.answer(message, text, priority=BULK, reply_markup=keyboard)
+
+@dp.callback_query_handler(search_cb.filter())
+async def search_page(call: types.CallbackQuery, callback_data: dict, state: FSMContext):
+    data = await state.get_data()
+    terms = data.get("search_terms")
+    windows = data.get("search_windows") or [None]
+    window = int(callback_data["window"])
+    if not terms or window >= len(windows):
+        await call.answer("⌛ Sake amfani da /search.")
+        return
+    offset = int(callback_data["offset"])
+    # Keyed by the window's start id, not its number: each user's windows
+    # start where the matches stood when they searched.
+    before = windows[window]
+    page = await result_cache.get_or_compute(("search", terms, before, offset), lambda: load_search_page(terms, before, offset))
+    if page is None:
+        await call.answer("❌ Babu sauran shafi.")
+        return
+    rows, has_prev, has_next, older = page
+    text, keyboard = render_search_page(terms, rows, window, offset, has_prev, has_next, older)
+    await remember_search_window(state, windows, window, older)
+    await sender.edit(call.message, text, priority=BULK, reply_markup=keyboard)
+    await call.answer()
+
+@dp.message_handler(commands=["stats"], user_id=ADMIN_IDS)
+async def cmd_stats(message: types.Message):
+    summary = render_summary() or "Babu bayanai tukuna."
+    await sender.answer(message, f"📊 Stats:\n{summary[:4000]}", priority=BULK)
+
+@dp.message_handler(commands=["maintenance"], user_id=ADMIN_IDS)
+async def cmd_maintenance(message: types.Message):
+    name = message.get_args().strip()
+    if name:
+        try:
+            result = await maintenance.run_job(name)
+        except KeyError:
+            await sender.answer(message, "⚠️ Ayyuka: checkpoint, vacuum, analyze, search_index, phone_snapshot")
+            return
+        _, duration, _ = maintenance.last_run[name]
+        await sender.answer(message, f"✅ {name}: {duration:.2f}s ({result})")
+        return
+    lines = [
+        f"{job}: {time.strftime('%Y-%m-%d %H:%M', time.localtime(ran_at))}, {duration:.2f}s ({result})"
+        for job, (ran_at, duration, result) in sorted(maintenance.last_run.items())
+    ]
+    await sender.answer(message, "🧹 Maintenance:\n" + ("\n".join(lines) or "Ba a yi ko ɗaya ba tukuna."))
+
+@dp.message_handler(Command("import", ignore_caption=False), user_id=ADMIN_IDS, content_types=types.ContentType.DOCUMENT)
+async def cmd_import(message: types.Message):
+    document = message.document
+    status = await sender.answer(message, "⏳ Ana shigo da lambobi...")
+    loop = asyncio.get_running_loop()
+    last_update = [time.monotonic()]
+
+    def progress(imported, skipped):
+        # Runs on the import thread; hand the status edit back to the event loop.
+        now = time.monotonic()
+        if now - last_update[0] >= 3:
+            last_update[0] = now
+            text = f"⏳ An shigo da {imported:,}, an tsallake {skipped:,}..."
+            asyncio.run_coroutine_threadsafe(sender.edit(status, text, priority=BULK), loop)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "import")
+        await document.download(destination_file=path)
+        # Batches commit on their own thread so the report write queue keeps
+        # getting the write lock between them.
+        imported, skipped = await loop.run_in_executor(
+            None, partial(import_file, path, detect_format(document.file_name or ""), document.file_name, progress=progress),
+        )
+    await sender.edit(status, f"✅ An gama: an shigo da {imported:,}, an tsallake {skipped:,} (an riga an report ko lamba ba daidai ba).")
+
+@dp.message_handler(commands=["export"], user_id=ADMIN_IDS)
+async def cmd_export(message: types.Message):
+    fmt = "json" if message.get_args().strip().lower() in ("json", "ndjson") else "csv"
+    status = await sender.answer(message, "⏳ Ana shirya export...")
+    loop = asyncio.get_running_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.gz")
+        count = await loop.run_in_executor(None, export_file, path, fmt)
+        with open(path, "rb") as fileobj:
+            document = types.InputFile(fileobj, filename=export_filename(fmt))
+            await sender.call(message.chat.id, message.answer_document, document, caption=f"📦 Reports {count:,}", priority=BULK)
+    await sender.edit(status, "✅ An gama export.", priority=BULK)
+
+@dp.message_handler(commands=["evidence"], user_id=ADMIN_IDS)
+async def cmd_evidence(message: types.Message):
+    phone = message.get_args()
+    if normalize_phone(phone) is None:
+        await sender.answer(message, "⚠️ Yi amfani da: /evidence +2348012345678")
+        return
+    files = await run_read(get_evidence_by_phone, phone)
+    if not files:
+        await sender.answer(message, "❌ Babu shaidar da aka tura don wannan lamba.")
+        return
+    # Sent by file_id, so Telegram serves them without a re-upload.
+    for kind, file_id in files:
+        send = message.answer_photo if kind == "photo" else message.answer_document
+        await sender.call(message.chat.id, send, file_id, priority=BULK)
+
+# Registered after /import so an admin's import document never counts as evidence.
+@dp.message_handler(content_types=[types.ContentType.PHOTO, types.ContentType.DOCUMENT])
+async def evidence_input(message: types.Message, state: FSMContext):
+    await report_handler.process_evidence(message, state)
+
+@dp.message_handler(commands=["done", "skip"])
+async def cmd_done(message: types.Message, state: FSMContext):
+    await report_handler.finish_evidence(message, state)
+
+async def metrics_endpoint(request):
+    return web.Response(text=render_prometheus(), content_type="text/plain")
+
+async def on_startup(dp: Dispatcher):
+    maintenance.start()
+
+async def on_shutdown(dp: Dispatcher):
+    await maintenance.stop()
+    await report_queue.stop()
+    await sender.stop()
+    await run_write(close_db)
+
+async def on_startup_webhook(dp: Dispatcher):
+    await on_startup(dp)
+    if WEBHOOK_URL:
+        await bot.set_webhook(WEBHOOK_URL + WEBHOOK_PATH, max_connections=MAX_CONCURRENT_UPDATES)
+
+async def process_logged(update):
+    try:
+        # process_updates, unlike process_update, runs the update middlewares.
+        await dp.process_updates([update])
+    except Exception:
+        logging.exception("Update %s failed", update.update_id)
+
+async def sync_index_periodically():
+    while True:
+        await asyncio.sleep(WORKER_SYNC_INTERVAL)
+        await run_read(sync_phone_index)
+
+async def run_worker(workers=1, stream=sys.stdin):
+    # Worker mode: the supervisor writes this process's updates as JSON lines
+    # on stdin; EOF means shut down once in-flight updates are done.
+    # Workers send on the same token, so each gets its share of the global rate.
+    sender.set_global_rate(SEND_GLOBAL_RATE / workers)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=1 << 22)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+    Bot.set_current(bot)
+    Dispatcher.set_current(dp)
+    syncing = asyncio.create_task(sync_index_periodically())
+    # Last queued task per chat: a chat's updates run one after another, in
+    # arrival order, while different chats run concurrently.
+    tails = {}
+
+    async def process_in_order(previous, update):
+        if previous is not None:
+            await previous
+        await process_logged(update)
+
+    def forget(chat_id, task):
+        if tails.get(chat_id) is task:
+            del tails[chat_id]
+
+    while line := await reader.readline():
+        data = json.loads(line)
+        chat_id = chat_id_of(data)
+        # One task per update, like the executor, so FSM context vars are fresh.
+        task = tails[chat_id] = asyncio.create_task(process_in_order(tails.get(chat_id), types.Update(**data)))
+        task.add_done_callback(partial(forget, chat_id))
+    if tails:
+        await asyncio.wait(list(tails.values()))
+    syncing.cancel()
+    await on_shutdown(dp)
+    await dp.storage.close()
+
+async def run_supervisor(workers, webhook):
+    supervisor = Supervisor(workers, worker_command(os.path.abspath(__file__), "--worker", str(workers)))
+    await supervisor.start()
+    # Workers share the database, so only the supervisor runs maintenance.
+    maintenance.start()
+    try:
+        if webhook:
+            await on_startup_webhook(dp)
+            runner = web.AppRunner(webhook_app(supervisor, WEBHOOK_PATH))
+            await runner.setup()
+            await web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT).start()
+            await asyncio.Event().wait()
+        else:
+            await poll_updates(bot, supervisor)
+    finally:
+        await supervisor.stop()
+        await maintenance.stop()
+        await run_write(close_db)
+        await (await bot.get_session()).close()
 
 if __name__ == '__main__':
-    executor.start_polling(dp, skip_updates=True)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--webhook", action="store_true", help="serve updates over a local aiohttp webhook instead of long polling")
+    parser.add_argument("--workers", type=int, default=0, help="receive updates here and shard them by chat over N worker processes")
+    # Set by the supervisor to the number of workers it runs.
+    parser.add_argument("--worker", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        # Ctrl+C reaches the whole process group; workers stop on EOF from the supervisor instead.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        asyncio.run(run_worker(args.worker))
+    elif args.workers:
+        logging.basicConfig(level=logging.INFO)
+        try:
+            asyncio.run(run_supervisor(args.workers, args.webhook))
+        except KeyboardInterrupt:
+            pass
+    elif args.webhook:
+        app = web.Application()
+        app.router.add_get("/metrics", metrics_endpoint)
+        executor.set_webhook(
+            dp, WEBHOOK_PATH,
+            on_startup=on_startup_webhook, on_shutdown=on_shutdown,
+            web_app=app,
+        ).run_app(host=WEBAPP_HOST, port=WEBAPP_PORT)
+    else:
+        executor.start_polling(dp, skip_updates=True, on_startup=on_startup, on_shutdown=on_shutdown)
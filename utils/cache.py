@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from utils.metrics import Gauge
+
+_MISSING = object()
+
+class ResultCache:
+    """
+    Bounded LRU cache with a TTL for rendered query results.
+
+    Writers call invalidate(), which bumps a generation counter. Results that
+    were still being computed when it ran carry the old generation and are
+    never stored, so a page read before a commit is not cached after it.
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.generation or entry[1] < time.monotonic():
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            # A result computed before the last invalidate() may be stale already.
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self.generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    async def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self.generation
+            value = await compute()
+            self.put(key, value, generation)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+result_cache = ResultCache(config.RESULT_CACHE_SIZE, config.RESULT_CACHE_TTL)
+Gauge("bot_result_cache_hits", "Listing and search pages served from the result cache.", lambda: result_cache.hits)
+Gauge("bot_result_cache_misses", "Listing and search pages that had to be queried.", lambda: result_cache.misses)
+Gauge("bot_result_cache_entries", "Pages currently held in the result cache.", lambda: len(result_cache))
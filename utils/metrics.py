@@ -0,0 +1,118 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from aiogram import Bot
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    def __init__(self, name, help_text, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, label_value, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, label_value):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(label_value, time.perf_counter() - start)
+
+    def quantile(self, label_value, q):
+        # Upper bound of the bucket holding the q-th observation.
+        with self._lock:
+            counts, _, total = self._series[label_value]
+            rank = q * total
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            return {key: (list(counts), total_sum, total) for key, (counts, total_sum, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total_sum, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{self.label}="{key}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{key}"}} {total_sum:.6f}')
+            lines.append(f'{self.name}_count{{{self.label}="{key}"}} {total}')
+        return lines
+
+class Gauge:
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        REGISTRY.append(self)
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+REGISTRY = []
+
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Time spent inside update handlers.", "handler")
+DB_SECONDS = Histogram("bot_db_seconds", "Time spent inside db/db.py functions.", "function")
+SEND_SECONDS = Histogram("bot_api_request_seconds", "Time spent on Bot API requests.", "method")
+MAINTENANCE_SECONDS = Histogram(
+    "bot_maintenance_seconds", "Time spent on background maintenance jobs.", "job",
+    buckets=(0.01, 0.05, 0.25, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+
+def timed(histogram, label_value=None):
+    def decorator(func):
+        name = label_value or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def render_summary():
+    lines = []
+    for metric in REGISTRY:
+        if isinstance(metric, Gauge):
+            lines.append(f"{metric.name}: {metric.read()}")
+            continue
+        for key, (_, total_sum, total) in sorted(metric.snapshot().items()):
+            p95 = metric.quantile(key, 0.95)
+            lines.append(f"{metric.name}[{key}]: n={total} avg={total_sum / total * 1000:.1f}ms p95<={p95 * 1000:.0f}ms")
+    return "\n".join(lines)
+
+class TimedBot(Bot):
+    async def request(self, method, data=None, files=None, **kwargs):
+        with SEND_SECONDS.time(method):
+            return await super().request(method, data, files, **kwargs)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from utils.metrics import HANDLER_SECONDS
+
+def _chat_id(update):
+    message = update.message or update.edited_message or update.channel_post or update.edited_channel_post
+    if message is not None:
+        return message.chat.id
+    if update.callback_query is not None:
+        call = update.callback_query
+        return call.message.chat.id if call.message is not None else call.from_user.id
+    return None
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    def __init__(self, limit, per_chat=None):
+        super().__init__()
+        self._semaphore = asyncio.Semaphore(limit)
+        self._per_chat = per_chat
+        # chat id -> [semaphore, updates holding or waiting for it]
+        self._chats = {}
+
+    async def on_pre_process_update(self, update, data):
+        # Replies wait for their chat's send rate, so one busy chat would
+        # otherwise hold every slot. Its extra updates queue on the chat's
+        # own semaphore and only take a shared slot once they can run.
+        chat_id = _chat_id(update) if self._per_chat else None
+        if chat_id is not None:
+            entry = self._chats.get(chat_id)
+            if entry is None:
+                entry = self._chats[chat_id] = [asyncio.Semaphore(self._per_chat), 0]
+            entry[1] += 1
+            data["_limit_chat"] = chat_id
+            await entry[0].acquire()
+        await self._semaphore.acquire()
+
+    async def on_post_process_update(self, update, results, data):
+        self._semaphore.release()
+        chat_id = data.pop("_limit_chat", None)
+        if chat_id is not None:
+            entry = self._chats[chat_id]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat_id]
+
+class MetricsMiddleware(BaseMiddleware):
+    async def _start(self, data):
+        data["_handler_started"] = (current_handler.get().__name__, time.perf_counter())
+
+    async def _finish(self, data):
+        started = data.pop("_handler_started", None)
+        if started is not None:
+            name, start = started
+            HANDLER_SECONDS.observe(name, time.perf_counter() - start)
+
+    async def on_process_message(self, message, data):
+        await self._start(data)
+
+    async def on_post_process_message(self, message, results, data):
+        await self._finish(data)
+
+    async def on_process_callback_query(self, call, data):
+        await self._start(data)
+
+    async def on_post_process_callback_query(self, call, results, data):
+        await self._finish(data)
+
+class CommandEndsStateMiddleware(BaseMiddleware):
+    def __init__(self, states):
+        super().__init__()
+        self._states = {state.state for state in states}
+
+    async def on_pre_process_message(self, message, data):
+        # A command sent in one of these states ends the conversation and then
+        # runs as it would outside it. Pre-process runs before the state
+        # filters read the state, so they already see it cleared.
+        if not message.is_command():
+            return
+        state = self.manager.dispatcher.current_state(chat=message.chat.id, user=message.from_user.id)
+        if await state.get_state() in self._states:
+            await state.finish()
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from utils.metrics import Gauge
+
+class SlidingWindowLimiter:
+    """
+    Allows `limit` hits per `window` seconds for each key.
+
+    Uses the sliding-window counter approximation: the previous fixed window's
+    count is weighted by how much of it still overlaps the sliding window, so
+    each key costs two counters and every check is O(1). The least recently
+    used keys are evicted once there are more than `max_keys`.
+    """
+
+    def __init__(self, limit, window, max_keys=50000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.rejected = 0
+        # key -> [window number, hits in it, hits in the window before]
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key, now):
+        current = int(now // self.window)
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [current, 0, 0]
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(key)
+            if entry[0] != current:
+                entry[2] = entry[1] if entry[0] == current - 1 else 0
+                entry[0], entry[1] = current, 0
+        return entry
+
+    def _estimate(self, entry, now):
+        overlap = 1 - (now / self.window - entry[0])
+        return entry[2] * overlap + entry[1]
+
+    def allowed(self, key):
+        now = time.monotonic()
+        with self._lock:
+            allowed = self._estimate(self._entry(key, now), now) < self.limit
+            if not allowed:
+                self.rejected += 1
+            return allowed
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(key, now)
+            if self._estimate(entry, now) >= self.limit:
+                self.rejected += 1
+                return False
+            entry[1] += 1
+            return True
+
+    def __len__(self):
+        return len(self._keys)
+
+class RepeatLimiter:
+    """
+    Allows one hit per `window` seconds for each key.
+
+    Stores the time of the last accepted hit, so the check is exact and O(1).
+    The sliding-window counter cannot do this for a limit of 1: just past a
+    window boundary it weighs the previous hit below 1 and lets a repeat in.
+    Keys stay ordered by their last hit, so eviction past `max_keys` drops the
+    one closest to expiring.
+    """
+
+    def __init__(self, window, max_keys=50000):
+        self.window = window
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        last = self._last.get(key)
+        return last is not None and now - last < self.window
+
+    def allowed(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if self._recent(key, now):
+                self.rejected += 1
+                return False
+            return True
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if self._recent(key, now):
+                self.rejected += 1
+                return False
+            self._last[key] = now
+            self._last.move_to_end(key)
+            if len(self._last) > self.max_keys:
+                self._last.popitem(last=False)
+            return True
+
+    def __len__(self):
+        return len(self._last)
+
+# Reports per user, and repeat reports of one number by the same user.
+report_user_limiter = SlidingWindowLimiter(config.REPORT_USER_LIMIT, config.REPORT_USER_WINDOW, config.RATE_LIMIT_MAX_KEYS)
+report_number_limiter = RepeatLimiter(config.REPORT_NUMBER_WINDOW, config.RATE_LIMIT_MAX_KEYS)
+Gauge("bot_report_user_limited", "Reports refused because the user sent too many.", lambda: report_user_limiter.rejected)
+Gauge("bot_report_duplicate_limited", "Reports refused because the user already reported the number.", lambda: report_number_limiter.rejected)
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+
+from utils.metrics import MAINTENANCE_SECONDS
+
+log = logging.getLogger(__name__)
+
+class MaintenanceScheduler:
+    """
+    Runs background jobs every `interval` seconds, one job at a time.
+
+    Each job is `func(*args)` handed to `run` (run_read or run_write), so the
+    work happens on the database threads and the event loop only waits for
+    it. Durations go to the bot_maintenance_seconds histogram.
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._task = None
+        self._current = None
+        self.last_run = {}
+
+    def add(self, name, interval, run, func, *args):
+        if interval > 0:
+            self._jobs.append((name, interval, run, func, args))
+
+    def start(self):
+        if self._task is None and self._jobs:
+            self._task = asyncio.create_task(self._run())
+
+    async def run_job(self, name):
+        for job_name, _, run, func, args in self._jobs:
+            if job_name == name:
+                break
+        else:
+            raise KeyError(name)
+        start = time.perf_counter()
+        try:
+            # Shielded: stopping the scheduler lets a running job finish, so
+            # the database is not closed underneath it.
+            self._current = asyncio.ensure_future(run(func, *args))
+            result = await asyncio.shield(self._current)
+        except Exception:
+            log.exception("Maintenance job %s failed", name)
+            result = None
+        duration = time.perf_counter() - start
+        MAINTENANCE_SECONDS.observe(name, duration)
+        self.last_run[name] = (time.time(), duration, result)
+        log.info("Maintenance job %s took %.3fs (%r)", name, duration, result)
+        return result
+
+    async def _run(self):
+        # Every job first runs one interval after startup, not while the
+        # bot is still loading its indexes.
+        now = time.monotonic()
+        due = {name: now + interval for name, interval, _, _, _ in self._jobs}
+        intervals = {name: interval for name, interval, _, _, _ in self._jobs}
+        while True:
+            name = min(due, key=due.get)
+            await asyncio.sleep(max(due[name] - time.monotonic(), 0))
+            await self.run_job(name)
+            due[name] = time.monotonic() + intervals[name]
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._current is not None:
+            await asyncio.gather(self._current, return_exceptions=True)
+        self._task = None
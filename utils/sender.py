@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+
+from aiogram.utils.exceptions import RetryAfter
+
+import config
+from utils.metrics import Gauge
+
+INTERACTIVE = 0
+BULK = 1
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class _Chat:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        # Pending sends ordered by (priority, sequence). Only the head is ever
+        # in flight, so messages to one chat arrive in order.
+        self.jobs = []
+        self.busy = False
+
+class SendScheduler:
+    def __init__(self, global_rate=30, chat_rate=1, chat_burst=3, group_rate=20 / 60, max_retries=3, max_chats=10000):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = OrderedDict()
+        self._queue = None
+        self._worker = None
+        self._sequence = itertools.count()
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def set_global_rate(self, rate):
+        # A capacity under one token would never let a message through.
+        self._global = TokenBucket(rate, max(rate, 1))
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # Negative ids are groups and channels, which Telegram limits per minute.
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            chat = self._chats[chat_id] = _Chat(TokenBucket(rate, self.chat_burst))
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if len(self._chats) > self.max_chats and not oldest.busy:
+                del self._chats[oldest_id]
+        else:
+            self._chats.move_to_end(chat_id)
+        return chat
+
+    async def call(self, chat_id, method, *args, priority=INTERACTIVE, **kwargs):
+        if self._worker is None:
+            self._queue = asyncio.PriorityQueue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        chat = self._chat(chat_id)
+        heapq.heappush(chat.jobs, [priority, next(self._sequence), chat, method, args, kwargs, future, 0])
+        self._pending += 1
+        if not chat.busy:
+            chat.busy = True
+            self._next(chat)
+        return await future
+
+    async def answer(self, message, text, priority=INTERACTIVE, **kwargs):
+        return await self.call(message.chat.id, message.answer, text, priority=priority, **kwargs)
+
+    async def edit(self, message, text, priority=INTERACTIVE, **kwargs):
+        return await self.call(message.chat.id, message.edit_text, text, priority=priority, **kwargs)
+
+    def _next(self, chat):
+        if not chat.jobs:
+            chat.busy = False
+            return
+        wait = chat.bucket.delay()
+        if wait > 0:
+            asyncio.get_running_loop().call_later(wait, self._next, chat)
+            return
+        chat.bucket.take()
+        self._queue.put_nowait(heapq.heappop(chat.jobs))
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            wait = self._global.delay()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._global.delay()
+            self._global.take()
+            asyncio.create_task(self._send(job))
+
+    async def _send(self, job):
+        _, _, chat, method, args, kwargs, future, attempts = job
+        try:
+            result = await method(*args, **kwargs)
+        except RetryAfter as e:
+            if attempts < self.max_retries:
+                job[7] = attempts + 1
+                heapq.heappush(chat.jobs, job)
+                asyncio.get_running_loop().call_later(e.timeout, self._next, chat)
+                return
+            self._finish(future, error=e)
+        except Exception as e:
+            self._finish(future, error=e)
+        else:
+            self._finish(future, result=result)
+        self._next(chat)
+
+    def _finish(self, future, result=None, error=None):
+        self._pending -= 1
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def stop(self, timeout=5):
+        if self._worker is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._worker.cancel()
+        self._worker = None
+
+sender = SendScheduler(
+    config.SEND_GLOBAL_RATE, config.SEND_CHAT_RATE, config.SEND_CHAT_BURST,
+    config.SEND_GROUP_RATE, config.SEND_MAX_RETRIES,
+)
+Gauge("bot_send_queue_depth", "Outgoing messages waiting for a rate limit slot.", lambda: len(sender))
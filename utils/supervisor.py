@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import sys
+
+from aiohttp import web
+from aiogram.utils.exceptions import NetworkError, TelegramAPIError
+
+log = logging.getLogger(__name__)
+
+_CHAT_UPDATES = ("message", "edited_message", "channel_post", "edited_channel_post", "my_chat_member", "chat_member", "chat_join_request")
+
+def chat_id_of(update):
+    for kind in _CHAT_UPDATES:
+        if kind in update:
+            return update[kind]["chat"]["id"]
+    callback = update.get("callback_query")
+    if callback is not None:
+        message = callback.get("message")
+        return message["chat"]["id"] if message else callback["from"]["id"]
+    # Inline queries, polls, payments: shard by the user instead.
+    for value in update.values():
+        if isinstance(value, dict):
+            user = value.get("from") or value.get("user")
+            if user:
+                return user["id"]
+    return 0
+
+class Supervisor:
+    """
+    Runs `workers` copies of `command` and feeds each one its share of updates
+    as JSON lines on stdin. Updates are sharded by chat id, so one chat's
+    updates always reach the same worker in the order they arrived.
+
+    Each worker has its own bounded queue and writer task, so a slow worker
+    only holds up its own shard once its queue is full.
+    """
+
+    def __init__(self, workers, command, queue_size=1000):
+        self.command = command
+        self.queue_size = queue_size
+        self._processes = [None] * workers
+        self._queues = []
+        self._watchers = []
+        self._writers = []
+        self._stopping = False
+
+    async def _spawn(self, index):
+        self._processes[index] = await asyncio.create_subprocess_exec(*self.command, stdin=asyncio.subprocess.PIPE)
+
+    async def _watch(self, index):
+        while not self._stopping:
+            code = await self._processes[index].wait()
+            if self._stopping:
+                return
+            log.error("Worker %d exited with %s; restarting it", index, code)
+            await asyncio.sleep(1)
+            await self._spawn(index)
+
+    async def start(self):
+        for index in range(len(self._processes)):
+            await self._spawn(index)
+        self._queues = [asyncio.Queue(self.queue_size) for _ in self._processes]
+        self._watchers = [asyncio.create_task(self._watch(index)) for index in range(len(self._processes))]
+        self._writers = [asyncio.create_task(self._write(index)) for index in range(len(self._processes))]
+
+    async def dispatch(self, update):
+        # Waits only when this shard's queue is full.
+        await self._queues[chat_id_of(update) % len(self._processes)].put(update)
+
+    async def _write(self, index):
+        queue = self._queues[index]
+        while True:
+            line = json.dumps(await queue.get(), separators=(",", ":")).encode() + b"\n"
+            while True:
+                process = self._processes[index]
+                try:
+                    process.stdin.write(line)
+                    await process.stdin.drain()
+                    break
+                except (BrokenPipeError, ConnectionResetError):
+                    # The worker died; _watch starts a new one and the line
+                    # goes to that. Updates the dead worker had read are lost.
+                    while self._processes[index] is process:
+                        await asyncio.sleep(0.1)
+            queue.task_done()
+
+    async def stop(self):
+        # Queued updates are written first, while crashed workers can still be restarted.
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+        self._stopping = True
+        for task in self._watchers + self._writers:
+            task.cancel()
+        # EOF on stdin tells a worker to finish what it has and shut down.
+        for process in self._processes:
+            process.stdin.close()
+        await asyncio.gather(*(process.wait() for process in self._processes))
+
+async def poll_updates(bot, supervisor, skip_updates=True, timeout=20):
+    # Raw getUpdates results are forwarded as-is; only workers parse them.
+    offset = 0
+    if skip_updates:
+        pending = await bot.request("getUpdates", {"offset": -1, "timeout": 0})
+        offset = pending[-1]["update_id"] + 1 if pending else 0
+    while True:
+        try:
+            updates = await bot.request("getUpdates", {"offset": offset, "timeout": timeout})
+        except (NetworkError, TelegramAPIError, asyncio.TimeoutError) as e:
+            log.warning("getUpdates failed: %s", e)
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            await supervisor.dispatch(update)
+        if updates:
+            offset = updates[-1]["update_id"] + 1
+
+def webhook_app(supervisor, path):
+    async def receive(request):
+        await supervisor.dispatch(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, receive)
+    return app
+
+def worker_command(*args):
+    return [sys.executable, *args]
@@ -0,0 +1,105 @@
+import html
+import string
+
+# Message templates by name, language and output format. "$name" fields are
+# filled in at render time; HTML output escapes the values it substitutes.
+TEMPLATES = {
+    "report": {
+        "ha": {
+            "plain": """📢 WhatsApp SCAMMER REPORT
+
+Lamba: $phone
+Dalili: $reason
+
+📝 Zaka iya turawa WhatsApp Support a: wa.me/wa_support
+""",
+            "html": """📢 <b>WhatsApp SCAMMER REPORT</b>
+
+<b>Lamba:</b> <code>$phone</code>
+<b>Dalili:</b> $reason
+
+📝 Zaka iya turawa WhatsApp Support a: wa.me/wa_support
+""",
+            "file": """WhatsApp SCAMMER REPORT
+Rana: $date
+
+Lamba: $phone
+Dalili: $reason
+
+Zaka iya turawa WhatsApp Support a: wa.me/wa_support
+""",
+        },
+        "en": {
+            "plain": """📢 WhatsApp SCAMMER REPORT
+
+Number: $phone
+Reason: $reason
+
+📝 You can forward this to WhatsApp Support at: wa.me/wa_support
+""",
+            "html": """📢 <b>WhatsApp SCAMMER REPORT</b>
+
+<b>Number:</b> <code>$phone</code>
+<b>Reason:</b> $reason
+
+📝 You can forward this to WhatsApp Support at: wa.me/wa_support
+""",
+            "file": """WhatsApp SCAMMER REPORT
+Date: $date
+
+Number: $phone
+Reason: $reason
+
+You can forward this to WhatsApp Support at: wa.me/wa_support
+""",
+        },
+    },
+}
+
+LANGUAGES = ("ha", "en")
+FORMATS = ("plain", "html", "file")
+
+class CompiledTemplate:
+    def __init__(self, source, escape=False):
+        self.fields = []
+        parts = []
+        position = 0
+        for match in string.Template.pattern.finditer(source):
+            parts.append(source[position:match.start()].replace("{", "{{").replace("}", "}}"))
+            name = match.group("named") or match.group("braced")
+            if name is not None:
+                self.fields.append(name)
+                parts.append("{" + name + "}")
+            elif match.group("escaped") is not None:
+                parts.append("$")
+            else:
+                raise ValueError(f"Invalid placeholder at position {match.start()} in template")
+            position = match.end()
+        parts.append(source[position:].replace("{", "{{").replace("}", "}}"))
+        # Rendering is then a single str.format_map call with no parsing.
+        self._format_map = "".join(parts).format_map
+        self._escape = escape
+
+    def render(self, values):
+        if self._escape:
+            values = {name: html.escape(str(value), quote=False) for name, value in values.items()}
+        return self._format_map(values)
+
+def compile_templates(templates=TEMPLATES):
+    return {
+        (name, language, fmt): CompiledTemplate(source, escape=fmt == "html")
+        for name, languages in templates.items()
+        for language, formats in languages.items()
+        for fmt, source in formats.items()
+    }
+
+# Compiled once at import, when the bot starts.
+_compiled = compile_templates()
+
+def language_for(user, default="ha"):
+    code = (getattr(user, "language_code", None) or "").split("-")[0].lower()
+    return code if code in LANGUAGES else default
+
+def render(name, language="ha", fmt="plain", **values):
+    template = _compiled.get((name, language, fmt)) or _compiled[(name, "ha", fmt)]
+    return template.render(values)